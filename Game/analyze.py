@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import argparse
+from time import time
+from collections import deque
+from multiprocessing import Pool
+from typing import List, Tuple, Iterator
+
+from .settings import *
+from .support import *
+from .board import Board
+from .engine import Engine
+from .epd import read_epd
+
+ANALYSIS_HASH = 4  # MB of transposition table per position, a new engine is used for every position
+
+
+def analyze_position(fen: str, depth: int = MAX_DEPTH, time_limit: float = None) -> dict:
+    """Searches a single position and gives the result.
+
+    Args:
+        fen (str): the position to analyze
+        depth (int, optional): maximum search depth. Defaults to MAX_DEPTH.
+        time_limit (float, optional): maximum search time in seconds. Defaults to None.
+
+    Returns:
+        dict: the best move, score in centipawns or moves to mate, reached depth, nodes and time
+    """
+    engine = Engine(Board(fen), hash_size=ANALYSIS_HASH)
+    progress = {'depth': 0, 'score': None}
+
+    t0 = time()
+    best_move = engine.search(depth, time_limit, progress.update)
+    t1 = time()
+
+    result = {
+        'fen': fen,
+        'bestmove': best_move.get_notation() if best_move else None,
+        'depth': progress['depth'],
+        'nodes': engine.nodes,
+        'time': round(t1 - t0, 3)
+    }
+    if progress['score'] is not None:
+        mate = get_mate_distance(progress['score'])
+        if mate is not None:
+            result['mate'] = mate
+        else:
+            result['cp'] = round(progress['score'] * 100)
+    return result
+
+
+def _analyze_task(task: Tuple[int, str, dict, int, float]) -> dict:
+    """Worker function analyzing one position of the input.
+
+    Args:
+        task (Tuple[int, str, dict, int, float]): the line number, fen, epd operations, depth and time limit
+
+    Returns:
+        dict: the analysis result with the line number and epd id, or the error when the position could not be analyzed
+    """
+    number, fen, operations, depth, time_limit = task
+    try:
+        result = analyze_position(fen, depth, time_limit)
+    except Exception as error:
+        result = {'fen': fen, 'error': repr(error)}
+    result['line'] = number
+    if 'id' in operations:
+        result['id'] = ' '.join(operations['id'])
+    return result
+
+
+def analyze_stream(input, depth: int = MAX_DEPTH, time_limit: float = None, processes: int = None, max_pending: int = None) -> Iterator[dict]:
+    """Analyzes the positions of a fen or epd stream with a pool of processes. Lines are read lazily and at most max_pending positions are queued at a time, so memory use does not grow with the input. Results are given in input order.
+
+    Args:
+        input: open text file with one position per line
+        depth (int, optional): maximum search depth. Defaults to MAX_DEPTH.
+        time_limit (float, optional): maximum search time per position in seconds. Defaults to None.
+        processes (int, optional): number of processes, 1 analyzes in this process, None uses all cpus. Defaults to None.
+        max_pending (int, optional): maximum number of queued positions. Defaults to 4 per process.
+
+    Yields:
+        Iterator[dict]: the result of every position
+    """
+    tasks = ((number, fen, operations, depth, time_limit)
+             for number, fen, operations in read_epd(input))
+
+    if processes == 1:
+        for task in tasks:
+            yield _analyze_task(task)
+        return
+
+    max_pending = max_pending or 4 * (processes or os.cpu_count() or 1)
+    with Pool(processes) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(_analyze_task, (task,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def main(argv: List[str] = None) -> None:
+    """Command line entry point of the batch analyzer, run with python -m Game.analyze.
+
+    Args:
+        argv (List[str], optional): command line arguments. Defaults to the arguments of the process.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m Game.analyze', description='Analyzes every fen or epd line of a file and writes the results as json lines.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='file with one position per line, - reads from stdin')
+    parser.add_argument('-o', '--output', default='-',
+                        help='file the json lines are written to, - writes to stdout')
+    parser.add_argument('--depth', type=int, default=None,
+                        help='search depth per position')
+    parser.add_argument('--movetime', type=float, default=None,
+                        help='search time per position in seconds')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='number of processes, 0 uses all cpus')
+    args = parser.parse_args(argv)
+
+    depth = args.depth or MAX_DEPTH
+    if args.depth is None and args.movetime is None:
+        depth = 4
+
+    input = sys.stdin if args.input == '-' else open(args.input)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        for result in analyze_stream(input, depth, args.movetime, args.processes or None):
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+    finally:
+        if input is not sys.stdin:
+            input.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
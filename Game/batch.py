@@ -0,0 +1,179 @@
+import argparse
+from itertools import islice
+from typing import List, Tuple, Iterable
+
+import numpy as np
+
+from .settings import *
+from .board import Board
+from .epd import read_epd
+
+# a position is packed as 64 int8 codes indexed by rank*8 + file, 0 is an empty square and a piece is 1 + type + 6*color
+_FEN_CODES = {name.upper(): 1 + type for type, name in enumerate(PIECE_NAME)}
+_FEN_CODES.update({name: 7 + type for type, name in enumerate(PIECE_NAME)})
+_CODE_LOOKUP = np.zeros(256, dtype=np.int8)
+for _char, _code in _FEN_CODES.items():
+    _CODE_LOOKUP[ord(_char)] = _code
+# empty squares are expanded to dots, so every placement becomes 64 characters
+_EXPAND = str.maketrans({**{str(n): '.' * n for n in range(1, 9)}, '/': ''})
+
+FEATURES = 10  # number of features of a position, see get_features
+
+
+def pack_fens(fens: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Packs positions given as fen strings without creating boards, the placement of all positions is converted with a single table lookup.
+
+    Args:
+        fens (Iterable[str]): the fen strings
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the (N, 64) int8 squares and the (N,) int8 player to move of the positions
+    """
+    placements = []
+    turns = []
+    for fen in fens:
+        fields = fen.split()
+        placement = fields[0].translate(_EXPAND)
+        if len(placement) != 64:
+            raise ValueError(f'invalid fen: {fen}')
+        placements.append(placement)
+        turns.append(1 if len(fields) > 1 and fields[1] == 'b' else 0)
+
+    data = np.frombuffer(''.join(placements).encode('ascii'), dtype=np.uint8)
+    return _CODE_LOOKUP[data].reshape(-1, 64), np.array(turns, dtype=np.int8)
+
+
+def pack_boards(boards: Iterable[Board]) -> Tuple[np.ndarray, np.ndarray]:
+    """Packs the current positions of boards.
+
+    Args:
+        boards (Iterable[Board]): the boards
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the (N, 64) int8 squares and the (N,) int8 player to move of the positions
+    """
+    squares = []
+    turns = []
+    for board in boards:
+        packed = [0] * 64
+        for color in range(2):
+            for type in range(6):
+                for piece in board.pieces[color][type]:
+                    packed[piece.rank * 8 + piece.file] = 1 + type + 6 * color
+        squares.append(packed)
+        turns.append(board.turn)
+    return np.array(squares, dtype=np.int8).reshape(-1, 64), np.array(turns, dtype=np.int8)
+
+
+def get_tables() -> np.ndarray:
+    """Gives the contribution of every piece code on every square to each feature of the evaluation: the difference in the number of pieces of every type and the knight, bishop, king and pawn placement scores.
+
+    Returns:
+        np.ndarray: (FEATURES, 13, 64) int32 table, negative for black pieces
+    """
+    tables = np.zeros((FEATURES, 13, 64), dtype=np.int32)
+    heatmaps = {4: (6, KNIGHT_HEATMAPS), 3: (7, BISHOP_HEATMAPS),
+                0: (8, KING_HEATMAPS), 5: (9, PAWN_HEATMAPS)}
+    for color, sign in ((0, 1), (1, -1)):
+        for type in range(6):
+            code = 1 + type + 6 * color
+            tables[type, code, :] = sign
+            if type in heatmaps:
+                feature, maps = heatmaps[type]
+                tables[feature, code, :] = sign * np.array(maps[color]).reshape(64)
+    return tables
+
+
+def get_features(squares: np.ndarray, chunk: int = BATCH_CHUNK) -> np.ndarray:
+    """Gives the features of packed positions from white's perspective with vectorized table lookups, the evaluation is a weighted sum of them.
+
+    Args:
+        squares (np.ndarray): (N, 64) piece codes given by pack_fens or pack_boards
+        chunk (int, optional): number of positions looked up at once. Defaults to BATCH_CHUNK.
+
+    Returns:
+        np.ndarray: (N, FEATURES) int32 features, the 6 piece count differences followed by the knight, bishop, king and pawn scores
+    """
+    tables = get_tables().reshape(FEATURES, 13 * 64)
+    offsets = np.arange(64)
+    features = np.empty((len(squares), FEATURES), dtype=np.int32)
+    for start in range(0, len(squares), chunk):
+        indices = squares[start:start + chunk].astype(np.intp) * 64 + offsets
+        features[start:start + chunk] = tables[:, indices].sum(axis=2).T
+    return features
+
+
+def evaluate_batch(squares: np.ndarray, turns: np.ndarray, chunk: int = BATCH_CHUNK) -> np.ndarray:
+    """Evaluates packed positions. The features are integers and are weighted and added in the same order as Engine.evaluate, so the scores are exactly the same.
+
+    Args:
+        squares (np.ndarray): (N, 64) piece codes given by pack_fens or pack_boards
+        turns (np.ndarray): (N,) player to move
+        chunk (int, optional): number of positions scored at once. Defaults to BATCH_CHUNK.
+
+    Returns:
+        np.ndarray: (N,) float64 evaluations from the perspective of the player to move
+    """
+    scores = np.empty(len(squares), dtype=np.float64)
+    for start in range(0, len(squares), chunk):
+        features = get_features(squares[start:start + chunk], chunk)
+
+        evaluation = np.zeros(len(features), dtype=np.float64)
+        for type in range(6):
+            evaluation += PIECE_VALUE[type] * features[:, type]
+        evaluation += KNIGHT_WEIGHT * features[:, 6]
+        evaluation += BISHOP_WEIGHT * features[:, 7]
+        evaluation += KING_WEIGHT * features[:, 8]
+        evaluation += PAWN_WEIGHT * features[:, 9]
+        scores[start:start + chunk] = np.where(
+            turns[start:start + chunk] == 0, evaluation, -evaluation)
+
+    return scores
+
+
+def evaluate_fens(fens: Iterable[str], chunk: int = BATCH_CHUNK) -> np.ndarray:
+    """Evaluates positions given as fen strings, packing them a chunk at a time so any number of positions can be scored.
+
+    Args:
+        fens (Iterable[str]): the fen strings
+        chunk (int, optional): number of positions packed and scored at once. Defaults to BATCH_CHUNK.
+
+    Returns:
+        np.ndarray: (N,) float64 evaluations from the perspective of the player to move
+    """
+    fens = iter(fens)
+    scores: List[np.ndarray] = []
+    while True:
+        batch = list(islice(fens, chunk))
+        if not batch:
+            break
+        scores.append(evaluate_batch(*pack_fens(batch), chunk))
+    return np.concatenate(scores) if scores else np.empty(0, dtype=np.float64)
+
+
+def main(argv: List[str] = None) -> None:
+    """Command line entry point of the batch evaluator, run with python -m Game.batch.
+
+    Args:
+        argv (List[str], optional): command line arguments. Defaults to the arguments of the process.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m Game.batch', description='Evaluates every position of a fen or epd file with the static evaluation of the engine.')
+    parser.add_argument('file', help='file with one fen or epd per line')
+    parser.add_argument('-o', '--output', help='file the scores are written to, one per line. Defaults to stdout.')
+    args = parser.parse_args(argv)
+
+    with open(args.file) as file:
+        scores = evaluate_fens(fen for _, fen, _ in read_epd(file))
+
+    output = open(args.output, 'w') if args.output else None
+    try:
+        for score in scores:
+            print(repr(float(score)), file=output)
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
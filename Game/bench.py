@@ -0,0 +1,262 @@
+import sys
+import json
+import argparse
+from time import perf_counter
+from typing import List, Tuple
+
+from .board import Board
+from .engine import Engine
+
+# opening, kiwipete, endgames and promotion heavy positions
+BENCH_FENS = [
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+    '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    '8/8/4k3/8/2R5/8/4K3/8 w - - 0 1',
+    '8/5pk1/6p1/8/3P4/4PK2/8/8 w - - 0 1',
+    'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+    'n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1'
+]
+
+# work of a benchmark on one position in one round, chosen so every benchmark takes a similar share of a round
+MOVEGEN_ITERATIONS = 300
+MAKE_UNMAKE_ITERATIONS = 60
+EVALUATE_ITERATIONS = 3000
+PERFT_DEPTH = 2
+SEARCH_DEPTH = 2
+
+# the benchmarks are repeated for at least MIN_ROUNDS rounds and MIN_TIME seconds, the fastest time of every position is used
+MIN_ROUNDS = 5
+MIN_TIME = 10.0
+
+
+def _timed(function, iterations: int) -> float:
+    """Runs a function a number of times and measures the total time.
+
+    Args:
+        function: function without arguments
+        iterations (int): number of calls
+
+    Returns:
+        float: total time in seconds
+    """
+    t0 = perf_counter()
+    for _ in range(iterations):
+        function()
+    return perf_counter() - t0
+
+
+def bench_movegen(fen: str) -> Tuple[int, float]:
+    """Measures the legal move generation speed.
+
+    Args:
+        fen (str): position to generate the moves of
+
+    Returns:
+        Tuple[int, float]: number of operations and time
+    """
+    board = Board(fen)
+    return MOVEGEN_ITERATIONS, _timed(board.get_legal_moves, MOVEGEN_ITERATIONS)
+
+
+def bench_make_unmake(fen: str) -> Tuple[int, float]:
+    """Measures the speed of making and unmaking every legal move.
+
+    Args:
+        fen (str): position to make the moves in
+
+    Returns:
+        Tuple[int, float]: number of operations and time
+    """
+    board = Board(fen)
+    moves = board.get_legal_moves()
+
+    def make_unmake():
+        for move in moves:
+            board.make_move(move)
+            board.unmake_move()
+
+    return MAKE_UNMAKE_ITERATIONS * len(moves), _timed(make_unmake, MAKE_UNMAKE_ITERATIONS)
+
+
+def bench_evaluate(fen: str) -> Tuple[int, float]:
+    """Measures the evaluation speed.
+
+    Args:
+        fen (str): position to evaluate
+
+    Returns:
+        Tuple[int, float]: number of operations and time
+    """
+    engine = Engine(Board(fen))
+    return EVALUATE_ITERATIONS, _timed(engine.evaluate, EVALUATE_ITERATIONS)
+
+
+def bench_perft(fen: str) -> Tuple[int, float]:
+    """Measures the perft speed in nodes per second.
+
+    Args:
+        fen (str): position to run the perft test on
+
+    Returns:
+        Tuple[int, float]: number of nodes and time
+    """
+    engine = Engine(Board(fen))
+    t0 = perf_counter()
+    nodes = engine.perft(PERFT_DEPTH)
+    return nodes, perf_counter() - t0
+
+
+def bench_search(fen: str) -> Tuple[int, float]:
+    """Measures the fixed depth search speed in nodes per second, the position is searched by a new engine.
+
+    Args:
+        fen (str): position to search
+
+    Returns:
+        Tuple[int, float]: number of nodes and time
+    """
+    engine = Engine(Board(fen), SEARCH_DEPTH)
+    engine.verbose = False
+    t0 = perf_counter()
+    engine.find_best_move()
+    return engine.nodes, perf_counter() - t0
+
+
+BENCHMARKS = {
+    'movegen': bench_movegen,
+    'make_unmake': bench_make_unmake,
+    'evaluate': bench_evaluate,
+    'perft': bench_perft,
+    'search': bench_search
+}
+
+
+def run_bench(fens: List[str] = None) -> dict:
+    """Runs all benchmarks in rounds, every round runs every benchmark once on every position, until MIN_ROUNDS rounds and MIN_TIME seconds have passed. Only the fastest time of every benchmark and position is counted, and as the benchmarks take turns a slow period of the machine affects all of them alike instead of showing up as a regression of one. The signature is the total number of perft and search nodes, it only changes when the move generation or search behaves differently.
+
+    Args:
+        fens (List[str], optional): positions to use. Defaults to BENCH_FENS.
+
+    Returns:
+        dict: the results per benchmark and the node signature
+    """
+    fens = fens or BENCH_FENS
+    ops = {name: [0] * len(fens) for name in BENCHMARKS}
+    fastest = {name: [float('inf')] * len(fens) for name in BENCHMARKS}
+    t0, rounds = perf_counter(), 0
+    while rounds < MIN_ROUNDS or perf_counter() - t0 < MIN_TIME:
+        for name, bench in BENCHMARKS.items():
+            for i, fen in enumerate(fens):
+                ops[name][i], time = bench(fen)
+                fastest[name][i] = min(fastest[name][i], time)
+        rounds += 1
+
+    results = {}
+    for name in BENCHMARKS:
+        total_ops, total_time = sum(ops[name]), sum(fastest[name])
+        results[name] = {'ops': total_ops, 'time': total_time,
+                         'ops_per_sec': total_ops / total_time, 'rounds': rounds}
+    return {
+        'benchmarks': results,
+        'signature': results['perft']['ops'] + results['search']['ops']
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Compares a bench result with a baseline result.
+
+    Args:
+        result (dict): the new result
+        baseline (dict): the saved result to compare to
+        tolerance (float): allowed relative slowdown, e.g. 0.05 for 5%
+
+    Returns:
+        List[str]: the regressions found, empty when there are none
+    """
+    regressions = []
+    if result['signature'] != baseline['signature']:
+        regressions.append(
+            f'signature changed: {baseline["signature"]} -> {result["signature"]}')
+    for name, bench in result['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            continue
+        old = baseline['benchmarks'][name]['ops_per_sec']
+        new = bench['ops_per_sec']
+        if new < old * (1 - tolerance):
+            regressions.append(
+                f'{name} is {round(100 * (1 - new / old), 1)}% slower: {round(old)} -> {round(new)} ops/s')
+    return regressions
+
+
+def format_result(result: dict, baseline: dict = None) -> str:
+    """Formats a bench result, with the change relative to a baseline when given.
+
+    Args:
+        result (dict): result given by run_bench
+        baseline (dict, optional): saved result to compare to. Defaults to None.
+
+    Returns:
+        str: readable text of the result
+    """
+    lines = []
+    for name, bench in result['benchmarks'].items():
+        line = f'{name:<12} {round(bench["ops_per_sec"]):>10} ops/s  ({bench["ops"]} ops in {round(bench["time"], 3)}s)'
+        if baseline and name in baseline['benchmarks']:
+            old = baseline['benchmarks'][name]['ops_per_sec']
+            line += f'  {round(100 * (bench["ops_per_sec"] / old - 1), 1):+}%'
+        lines.append(line)
+    lines.append(f'signature    {result["signature"]}')
+    return '\n'.join(lines)
+
+
+def main(argv: List[str] = None) -> dict:
+    """Command line entry point of the benchmark, run with python -m Game.bench.
+
+    Args:
+        argv (List[str], optional): command line arguments. Defaults to the arguments of the process.
+
+    Returns:
+        dict: the bench result
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m Game.bench', description='Benchmarks move generation, make/unmake, evaluation, perft and search on a fixed set of positions.')
+    parser.add_argument('--save', help='save the result as json to this file')
+    parser.add_argument(
+        '--compare', help='compare the result to a result saved with --save, exits with 1 on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='allowed relative slowdown when comparing. Defaults to 0.1')
+    parser.add_argument('--json', action='store_true',
+                        help='print the result as a single json line')
+    args = parser.parse_args(argv)
+
+    result = run_bench()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(format_result(result, baseline))
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(result, file, indent=4)
+
+    if baseline:
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION: {regression}')
+        if regressions:
+            sys.exit(1)
+
+    return result
+
+
+if __name__ == '__main__':
+    main()
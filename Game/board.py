@@ -1,5 +1,3 @@
-import pygame
-import pyperclip
 from copy import deepcopy
 from typing import Tuple, List
 from collections import defaultdict
@@ -8,6 +6,7 @@ from .settings import *
 from .support import *
 from .piece import Piece
 from .move import Move
+from .pgn import format_pgn
 
 
 class Board:
@@ -18,6 +17,7 @@ class Board:
             fen (str): A FEN string (Forsyth-Edwards Notation)
         """
         self.fen = fen
+        self.observers = []  # evaluators that are told about every move, see Evaluator
         self.reset()
 
         self._move_functions = {
@@ -40,11 +40,18 @@ class Board:
         self.move_log: List[Move] = []
         self.state_log = []
 
+        for observer in self.observers:
+            observer.reset()
+
     def read_fen(self) -> None:
         """Reads the fen string given on creation and converts it to a position and game state.
         """
         self.position = [
             [None for _ in range(8)] for _ in range(8)]
+        # piece lists per color and type, so only occupied squares have to be visited
+        self.pieces: List[List[List[Piece]]] = [
+            [[] for _ in range(6)] for _ in range(2)]
+        self.piece_count = 0
         fen_pos, fen_turn, fen_castle, fen_enpassant_target_square, fen_halfturn, fen_fullturn = self.fen.split(
             ' ')
 
@@ -65,6 +72,8 @@ class Board:
                         self.black_king = (rank, file)
 
                 self.position[rank][file] = Piece(rank, file, type, color)
+                self.pieces[color][type].append(self.position[rank][file])
+                self.piece_count += 1
                 file += 1
             elif char.isnumeric():
                 file += int(char)
@@ -101,6 +110,55 @@ class Board:
         # full turn
         self.fullturn = int(fen_fullturn)
 
+        self.key = self.get_key()
+        self.pawn_key = self.get_pawn_key()
+
+    def get_key(self) -> int:
+        """Calculates the zobrist key of the current position from scratch. During the game the key is updated incrementally in self.key.
+
+        Returns:
+            int: 64 bit key of the position
+        """
+        key = 0
+        for color in range(2):
+            for type, pieces in enumerate(self.pieces[color]):
+                for piece in pieces:
+                    key ^= ZOBRIST_PIECES[color][type][piece.rank][piece.file]
+
+        if self.turn == 1:
+            key ^= ZOBRIST_TURN
+
+        return key ^ self._get_state_key()
+
+    def get_pawn_key(self) -> int:
+        """Calculates the zobrist key of the pawns in the current position from scratch, the key of the pawn structure used to cache pawn scores. During the game the key is updated incrementally in self.pawn_key.
+
+        Returns:
+            int: 64 bit key of the pawns
+        """
+        key = 0
+        for color in range(2):
+            for piece in self.pieces[color][5]:
+                key ^= ZOBRIST_PIECES[color][5][piece.rank][piece.file]
+        return key
+
+    def _get_state_key(self) -> int:
+        """Calculates the part of the zobrist key given by the castling rights and en passant target square.
+
+        Returns:
+            int: key of the castling rights and en passant target square
+        """
+        key = 0
+        for color in range(2):
+            for side in range(2):
+                if self.castle[color][side]:
+                    key ^= ZOBRIST_CASTLE[color][side]
+
+        if self.en_passant_target_square:
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant_target_square[1]]
+
+        return key
+
     def get_fen(self) -> str:
         """Generates the fen string of the current board state.
 
@@ -165,10 +223,196 @@ class Board:
 
         fen += str(self.fullturn)
 
-        pyperclip.copy(fen)
-
         return fen
 
+    def get_san(self, move: Move, legal_moves: List[Move] = None) -> str:
+        """Gives a legal move of the current position in standard algebraic notation.
+
+        Args:
+            move (Move): the move, it has not been made yet
+            legal_moves (List[Move], optional): the legal moves of the current position, generated when not given. Defaults to None.
+
+        Returns:
+            str: standard algebraic notation of the move, e.g. Nbd7, exd6, e8=Q+ or O-O#
+        """
+        if move.is_castle:
+            san = 'O-O' if move.target_file > move.start_file else 'O-O-O'
+        else:
+            target = pos_to_not(move.target_rank, move.target_file)
+            piece_type = move.piece.type
+            if piece_type == 5:
+                san = target
+                if move.captured:
+                    san = f'{pos_to_not(move.start_rank, move.start_file)[0]}x{target}'
+                if move.is_promotion:
+                    san += f'={PIECE_NAME[move.promotion_choice].upper()}'
+            else:
+                # other pieces of the same type that can move to the same square
+                if legal_moves is None:
+                    legal_moves = self.get_legal_moves()
+                others = [other for other in legal_moves
+                          if other.piece.type == piece_type and other.move_id != move.move_id and
+                          other.target_rank == move.target_rank and other.target_file == move.target_file]
+
+                start = pos_to_not(move.start_rank, move.start_file)
+                disambiguation = ''
+                if others:
+                    if all(other.start_file != move.start_file for other in others):
+                        disambiguation = start[0]
+                    elif all(other.start_rank != move.start_rank for other in others):
+                        disambiguation = start[1]
+                    else:
+                        disambiguation = start
+
+                san = f'{PIECE_NAME[piece_type].upper()}{disambiguation}{"x" if move.captured else ""}{target}'
+
+        # check and checkmate suffixes
+        self.make_move(move)
+        checked, _, _ = self._check_for_pins_and_checks()
+        if checked:
+            san += '#' if not self.get_legal_moves() else '+'
+        self.unmake_move()
+
+        return san
+
+    def parse_san(self, san: str) -> Move:
+        """Finds the legal move of the current position given in standard algebraic notation. Check suffixes and annotations are ignored and castling may be written with zeros.
+
+        Args:
+            san (str): the move, e.g. Nf3, exd5, e8=Q or O-O
+
+        Raises:
+            ValueError: when the move is not legal or ambiguous
+
+        Returns:
+            Move: the legal move
+        """
+        text = san.strip().rstrip('+#!?')
+        legal_moves = self.get_legal_moves()
+
+        if text in ('O-O', 'O-O-O', '0-0', '0-0-0'):
+            for move in legal_moves:
+                if move.is_castle and (move.target_file > move.start_file) == (len(text) == 3):
+                    return move
+            raise ValueError(f'illegal move: {san}')
+
+        # the promotion piece may also be written without =
+        promotion = None
+        if '=' in text:
+            text, choice = text.split('=', 1)
+            if choice not in ('Q', 'R', 'B', 'N'):
+                raise ValueError(f'invalid move: {san}')
+            promotion = PIECE_NAME.index(choice.lower())
+        elif len(text) > 2 and text[-1] in 'QRBN' and text[-2].isdigit():
+            text, promotion = text[:-1], PIECE_NAME.index(text[-1].lower())
+
+        piece_type = 5
+        if text and text[0] in 'KQRBN':
+            piece_type = PIECE_NAME.index(text[0].lower())
+            text = text[1:]
+        text = text.replace('x', '').replace('-', '')
+
+        target = not_to_pos(text[-2:]) if len(text) >= 2 else None
+        if target is None:
+            raise ValueError(f'invalid move: {san}')
+        disambiguation = text[:-2]
+
+        candidates = []
+        for move in legal_moves:
+            if (move.piece.type != piece_type or move.is_castle or
+                    (move.target_rank, move.target_file) != target):
+                continue
+            if move.is_promotion != (promotion is not None):
+                continue
+            if move.is_promotion and move.promotion_choice != promotion:
+                continue
+            start = pos_to_not(move.start_rank, move.start_file)
+            if all(char in start for char in disambiguation):
+                candidates.append(move)
+
+        if not candidates:
+            raise ValueError(f'illegal move: {san}')
+        if len(candidates) > 1:
+            raise ValueError(f'ambiguous move: {san}')
+        return candidates[0]
+
+    def make_san_move(self, san: str) -> Move:
+        """Makes a move given in standard algebraic notation.
+
+        Args:
+            san (str): the move
+
+        Returns:
+            Move: the move that was made
+        """
+        move = self.parse_san(san)
+        self.make_move(move)
+        return move
+
+    def get_san_log(self) -> List[str]:
+        """Gives the moves made since the position given on creation in standard algebraic notation. The moves are taken back and replayed, so the board ends in the same state.
+
+        Returns:
+            List[str]: the moves in standard algebraic notation
+        """
+        moves = []
+        while self.move_log:
+            moves.append(self.move_log[-1])
+            self.unmake_move()
+
+        san_log = []
+        for move in reversed(moves):
+            san_log.append(self.get_san(move))
+            self.make_move(move)
+        return san_log
+
+    def get_san_line(self, moves: List[Move]) -> List[str]:
+        """Gives a line of moves played from the current position, like a principal variation, in standard algebraic notation. The moves are made and taken back, so the board ends in the same state.
+
+        Args:
+            moves (List[Move]): the moves of the line
+
+        Returns:
+            List[str]: the moves in standard algebraic notation
+        """
+        san_line = []
+        for move in moves:
+            san_line.append(self.get_san(move))
+            self.make_move(move)
+        for _ in moves:
+            self.unmake_move()
+        return san_line
+
+    def get_pgn(self, headers: dict = None, result: str = '*') -> str:
+        """Writes the moves made since the position given on creation as pgn.
+
+        Args:
+            headers (dict, optional): headers of the game, like Event, White and Black. Defaults to None.
+            result (str, optional): the result of the game. Defaults to '*'.
+
+        Returns:
+            str: pgn text of the game
+        """
+        headers = dict(headers or {})
+        if self.fen != START_FEN:
+            headers['SetUp'] = '1'
+            headers['FEN'] = self.fen
+        return format_pgn(headers, self.get_san_log(), result)
+
+    def load_pgn(self, game: dict) -> None:
+        """Sets up the board with a game read by pgn.read_pgn and plays its moves.
+
+        Args:
+            game (dict): the headers and moves of the game
+
+        Raises:
+            ValueError: when one of the moves is not legal
+        """
+        self.fen = game['headers'].get('FEN', START_FEN)
+        self.reset()
+        for san in game['moves']:
+            self.make_san_move(san)
+
     def make_move(self, move: Move) -> None:
         """Makes a move on the board and handles all special move cases.
 
@@ -179,13 +423,33 @@ class Board:
         self.state_log.append([deepcopy(self.castle),
                                self.en_passant_target_square,
                                self.halfturn,
-                               self.fullturn])
+                               self.fullturn,
+                               self.key,
+                               self.pawn_key])
+
+        # the moved piece, captured piece and old state are removed from the key, the new ones are added at the end
+        color = move.piece.color
+        key = self.key ^ self._get_state_key() ^ ZOBRIST_TURN
+        key ^= ZOBRIST_PIECES[color][move.piece.type][move.start_rank][move.start_file]
 
         self.position[move.start_rank][move.start_file], self.position[move.target_rank][
             move.target_file] = None, self.position[move.start_rank][move.start_file]
 
+        if move.captured:
+            self.pieces[move.captured.color][move.captured.type].remove(
+                move.captured)
+            self.piece_count -= 1
+            key ^= ZOBRIST_PIECES[move.captured.color][move.captured.type][move.captured.rank][move.captured.file]
+            if move.captured.type == 5:
+                self.pawn_key ^= ZOBRIST_PIECES[move.captured.color][5][move.captured.rank][move.captured.file]
+
         # handles special pawn moves
         if move.piece.type == 5:
+            # the pawn is moved in the pawn key, a promoted pawn is only removed from it
+            self.pawn_key ^= ZOBRIST_PIECES[color][5][move.start_rank][move.start_file]
+            if not move.is_promotion:
+                self.pawn_key ^= ZOBRIST_PIECES[color][5][move.target_rank][move.target_file]
+
             if abs(move.start_rank - move.target_rank) == 2:
                 self.en_passant_target_square = (
                     (move.start_rank + move.target_rank)//2, move.start_file)
@@ -194,7 +458,10 @@ class Board:
 
             # promotion move
             if move.is_promotion:
+                self.pieces[move.piece.color][5].remove(move.piece)
                 move.piece.promote_to(move.promotion_choice)
+                self.pieces[move.piece.color][move.piece.type].append(
+                    move.piece)
 
             # en passant move, removes the captured pawn
             if move.is_enpassant:
@@ -212,12 +479,15 @@ class Board:
 
             # handles castling move
             if move.is_castle:
+                rook_key = ZOBRIST_PIECES[color][2][move.start_rank]
                 if move.start_file < move.target_file:
                     self.position[move.start_rank][7], self.position[move.start_rank][5] = None, move.castled_rook
                     move.castled_rook.move(move.start_rank, 5)
+                    key ^= rook_key[7] ^ rook_key[5]
                 else:
                     self.position[move.start_rank][0], self.position[move.start_rank][3] = None, move.castled_rook
                     move.castled_rook.move(move.start_rank, 3)
+                    key ^= rook_key[0] ^ rook_key[3]
 
         # update castling rights for rook move
         elif move.piece.type == 2:
@@ -232,46 +502,57 @@ class Board:
             # updates en_passant_target_square
             self.en_passant_target_square = ()
 
+        # a captured rook on its starting square removes the castling right on that side
         if move.captured and move.captured.type == 2:
-            if move.captured.color == 0:
-                if move.target_file == 7:
-                    self.castle[0][0] = False
-                if move.target_rank == 0:
-                    self.castle[0][1] = False
-            else:
-                if move.target_file == 7:
-                    self.castle[1][0] = False
-                if move.target_rank == 0:
-                    self.castle[1][1] = False
+            captured_color = move.captured.color
+            if (move.target_rank, move.target_file) == (7 - 7*captured_color, 7):
+                self.castle[captured_color][0] = False
+            if (move.target_rank, move.target_file) == (7 - 7*captured_color, 0):
+                self.castle[captured_color][1] = False
 
         # moves the piece object
         move.piece.move(move.target_rank, move.target_file)
 
+        key ^= ZOBRIST_PIECES[color][move.piece.type][move.target_rank][move.target_file]
+        self.key = key ^ self._get_state_key()
+
         # updating the turn
         self.turn = (self.turn + 1) % 2
 
         if self.turn == 0:
             self.fullturn += 1
 
-        if move.captured or move.piece.type == 5:
+        # the piece of a promotion has already become the promoted piece
+        if move.captured or move.piece.type == 5 or move.is_promotion:
             self.halfturn = 0
         else:
             self.halfturn += 1
 
+        for observer in self.observers:
+            observer.make_move(move)
+
     def unmake_move(self) -> None:
         """Unmakes the last move made in the case that there is a last move.
         """
         if self.move_log:
             move = self.move_log.pop()
-            self.castle, self.en_passant_target_square, self.halfturn, self.fullturn = self.state_log.pop()
+            self.castle, self.en_passant_target_square, self.halfturn, self.fullturn, self.key, self.pawn_key = self.state_log.pop()
 
             self.turn = (self.turn + 1) % 2
 
             self.position[move.start_rank][move.start_file], self.position[
                 move.target_rank][move.target_file] = move.piece, move.captured
 
+            if move.captured:
+                self.pieces[move.captured.color][move.captured.type].append(
+                    move.captured)
+                self.piece_count += 1
+
             if move.is_promotion:
+                self.pieces[move.piece.color][move.piece.type].remove(
+                    move.piece)
                 move.piece.promote_to(5)
+                self.pieces[move.piece.color][5].append(move.piece)
 
             if move.piece.type == 5:
                 if move.is_enpassant:
@@ -294,6 +575,156 @@ class Board:
 
             move.piece.move(move.start_rank, move.start_file)
 
+            for observer in self.observers:
+                observer.unmake_move(move)
+
+    def is_insufficient_material(self) -> bool:
+        """Checks if neither side has enough material to checkmate: only kings, a single minor piece or only bishops on squares of the same color are left.
+
+        Returns:
+            bool: wether the material is insufficient
+        """
+        for color in range(2):
+            if self.pieces[color][1] or self.pieces[color][2] or self.pieces[color][5]:
+                return False
+
+        if self.piece_count <= 3:
+            return True
+        if self.pieces[0][4] or self.pieces[1][4]:
+            return False
+
+        square_colors = {(bishop.rank + bishop.file) % 2
+                         for color in range(2) for bishop in self.pieces[color][3]}
+        return len(square_colors) == 1
+
+    def is_repetition(self, count: int = 3) -> bool:
+        """Checks if the current position has occured a number of times. Only the positions since the last capture or pawn move with the same player to move are compared.
+
+        Args:
+            count (int, optional): number of occurences including the current position. Defaults to 3.
+
+        Returns:
+            bool: wether the position occured at least count times
+        """
+        occurences = 1
+        start = max(len(self.state_log) - self.halfturn, 0)
+        for i in range(len(self.state_log) - 2, start - 1, -2):
+            if self.state_log[i][4] == self.key:
+                occurences += 1
+                if occurences >= count:
+                    return True
+        return False
+
+    def is_draw(self, repetitions: int = 3) -> bool:
+        """Checks if the game is drawn by insufficient material, the 50 move rule or repetition. The check is cheap enough to be done in every node of the search, stalemate is not included since it needs the legal moves.
+
+        Args:
+            repetitions (int, optional): number of occurences of a position that is a draw, the search uses 2. Defaults to 3.
+
+        Returns:
+            bool: wether the game is drawn
+        """
+        return self.halfturn >= 100 or self.is_insufficient_material() or self.is_repetition(repetitions)
+
+    def game_state(self) -> str:
+        """Gives the state of the game.
+
+        Returns:
+            str: 'checkmate', 'stalemate', 'insufficient material', '50 move rule', 'repetition' or 'ongoing'
+        """
+        if not self.get_legal_moves():
+            return 'checkmate' if self._checked else 'stalemate'
+        if self.is_insufficient_material():
+            return 'insufficient material'
+        if self.halfturn >= 100:
+            return '50 move rule'
+        if self.is_repetition():
+            return 'repetition'
+        return 'ongoing'
+
+    def static_exchange(self, move: Move) -> float:
+        """Gives the static exchange evaluation of a move, the material won or lost when both players keep recapturing on the target square with their least valuable attacker and may stop whenever continuing would lose material. Pieces behind an attacker join the exchange once it has captured, pins are not taken into account.
+
+        Args:
+            move (Move): the move, usually a capture
+
+        Returns:
+            float: material won by the player making the move in PIECE_VALUE units, negative for a losing exchange
+        """
+        rank, file = move.target_rank, move.target_file
+        gain = [PIECE_VALUE[move.captured.type] if move.captured else 0]
+        if move.is_promotion:
+            gain[0] += PIECE_VALUE[move.promotion_choice] - PIECE_VALUE[5]
+            on_square = PIECE_VALUE[move.promotion_choice]
+        else:
+            on_square = PIECE_VALUE[move.piece.type]
+
+        # squares that have been left during the exchange, the pieces behind them can attack through
+        removed = {(move.start_rank, move.start_file)}
+        if move.is_enpassant:
+            removed.add((move.captured.rank, move.captured.file))
+
+        color = (move.piece.color + 1) % 2
+        while True:
+            attacker = self._get_least_valuable_attacker(rank, file, color, removed)
+            if not attacker:
+                break
+            gain.append(on_square - gain[-1])
+            on_square = PIECE_VALUE[attacker.type]
+            removed.add((attacker.rank, attacker.file))
+            color = (color + 1) % 2
+
+        # every player chooses between recapturing and stopping, from the last capture back to the first
+        for i in range(len(gain) - 1, 0, -1):
+            gain[i - 1] = -max(-gain[i - 1], gain[i])
+        return gain[0]
+
+    def _get_least_valuable_attacker(self, rank: int, file: int, color: int, removed: set) -> Piece:
+        """Finds the least valuable piece of a player that attacks a square, ignoring the pieces on removed squares.
+
+        Args:
+            rank (int): rank of the square
+            file (int): file of the square
+            color (int): color of the attacking player
+            removed (set): (rank, file) squares that are treated as empty
+
+        Returns:
+            Piece: the attacker, None if the square is not attacked
+        """
+        position = self.position
+        # a pawn of the player attacks the square from where a pawn of the opponent on the square would attack
+        for r, f in PAWN_ATTACKS[(color + 1) % 2][rank][file]:
+            piece = position[r][f]
+            if piece and piece.type == 5 and piece.color == color and (r, f) not in removed:
+                return piece
+
+        attackers = []
+        for r, f in KNIGHT_ATTACKS[rank][file]:
+            piece = position[r][f]
+            if piece and piece.type == 4 and piece.color == color and (r, f) not in removed:
+                attackers.append(piece)
+                break
+
+        for direction, ray in enumerate(RAYS[rank][file]):
+            sliders = (1, 2) if direction < 4 else (1, 3)
+            for square in ray:
+                if square in removed:
+                    continue
+                piece = position[square[0]][square[1]]
+                if piece:
+                    if piece.color == color and piece.type in sliders:
+                        attackers.append(piece)
+                    break
+
+        for r, f in KING_ATTACKS[rank][file]:
+            piece = position[r][f]
+            if piece and piece.type == 0 and piece.color == color and (r, f) not in removed:
+                attackers.append(piece)
+
+        if not attackers:
+            return None
+        return min(attackers, key=lambda piece: PIECE_VALUE[piece.type])
+
     def get_legal_moves(self) -> List[Move]:
         """Generates all legal moves in a position.
 
@@ -301,6 +732,7 @@ class Board:
             List[Move]: list of legal moves
         """
         self._checked, self._pinned, self._checking = self._check_for_pins_and_checks()
+        self._attacked = self._get_attacked_squares()
 
         if self.turn == 0:
             king_rank, king_file = self.white_king
@@ -412,6 +844,40 @@ class Board:
 
         return checked, pinned, checking
 
+    def _get_attacked_squares(self) -> set:
+        """Generates the set of squares attacked by the opponent in one pass over its pieces. Sliding pieces see through the king of the player to move, so the king can not step back along a checking ray.
+
+        Returns:
+            set: set of (rank, file) squares attacked by the opponent
+        """
+        attacked = set()
+        enemy = (self.turn + 1) % 2
+        king = self.white_king if self.turn == 0 else self.black_king
+
+        pieces = self.pieces[enemy]
+        for piece in pieces[5]:
+            attacked.update(PAWN_ATTACKS[enemy][piece.rank][piece.file])
+        for piece in pieces[4]:
+            attacked.update(KNIGHT_ATTACKS[piece.rank][piece.file])
+        for piece in pieces[0]:
+            attacked.update(KING_ATTACKS[piece.rank][piece.file])
+
+        for type in (1, 2, 3):
+            for piece in pieces[type]:
+                if type == 1:
+                    rays = RAYS[piece.rank][piece.file]
+                elif type == 2:
+                    rays = RAYS[piece.rank][piece.file][:4]
+                else:
+                    rays = RAYS[piece.rank][piece.file][4:]
+                for ray in rays:
+                    for square in ray:
+                        attacked.add(square)
+                        if self.position[square[0]][square[1]] and square != king:
+                            break
+
+        return attacked
+
     def _check_for_en_passant_pin(self, rank: int, file: int) -> bool:
         """Checks if the pawn on the specified square is incapable of making an en passant move due to the king being in check afterwards.
 
@@ -462,11 +928,10 @@ class Board:
             List[Move]: list of pseudo legal moves
         """
         moves = []
-        for rank in range(8):
-            for file in range(8):
-                piece = self.position[rank][file]
-                if piece and piece.color == self.turn:
-                    self._move_functions[piece.type](rank, file, moves)
+        for type, pieces in enumerate(self.pieces[self.turn]):
+            move_function = self._move_functions[type]
+            for piece in pieces:
+                move_function(piece.rank, piece.file, moves)
         return moves
 
     def _get_pawn_moves(self, rank: int, file: int, move_list: list) -> None:
@@ -508,7 +973,7 @@ class Board:
 
         # if the pawn is not on the left edge it can move left
         if file > 0:
-            if not pinned or pin_direction == (-1, -1) or pin_direction == (1, 1):
+            if not pinned or pin_direction == (pawn_direction, -1) or pin_direction == (-pawn_direction, 1):
                 target_rank, target_file = rank + pawn_direction, file - 1
                 target_piece = self.position[target_rank][target_file]
                 if target_piece and target_piece.color != self.turn:
@@ -516,7 +981,7 @@ class Board:
                         Move(self.position, (rank, file), (target_rank, target_file)))
 
                     # add promotion moves
-                    if target_rank == 0:
+                    if target_rank == 0 or target_rank == 7:
                         for i in range(2, 5):
                             move_list.append(
                                 Move(self.position, (rank, file), (target_rank, target_file), promotion_choice=i))
@@ -529,7 +994,7 @@ class Board:
 
         # if the pawn is not on the right edge it can move right
         if file < 7:
-            if not pinned or pin_direction == (-1, 1) or pin_direction == (1, -1):
+            if not pinned or pin_direction == (pawn_direction, 1) or pin_direction == (-pawn_direction, -1):
                 target_rank, target_file = rank + pawn_direction, file + 1
                 target_piece = self.position[target_rank][target_file]
                 if target_piece and target_piece.color != self.turn:
@@ -537,7 +1002,7 @@ class Board:
                         Move(self.position, (rank, file), (target_rank, target_file)))
 
                     # add promotion moves
-                    if rank + pawn_direction == 0:
+                    if target_rank == 0 or target_rank == 7:
                         for i in range(2, 5):
                             move_list.append(
                                 Move(self.position, (rank, file), (target_rank, target_file), promotion_choice=i))
@@ -549,77 +1014,41 @@ class Board:
                             Move(self.position, (rank, file), (target_rank, target_file), enpassant=True))
 
     def _get_king_moves(self, rank: int, file: int, move_list: list) -> None:
-        """Generates all pseudo legal king moves in the current position and adds them to the given move list.
+        """Generates all legal king moves in the current position and adds them to the given move list, using the squares attacked by the opponent.
 
         Args:
             rank (int): rank of the king
             file (int): file of the king
             move_list (list): list the generated moves should be added to
         """
-        moves = ((0, 1), (0, -1), (1, 0), (-1, 0),
-                 (1, 1), (1, -1), (-1, 1), (-1, -1))
-        for i in moves:
-            target_rank, target_file = rank + i[0], file + i[1]
-            if 0 <= target_rank < 8 and 0 <= target_file < 8:
-                target = self.position[target_rank][target_file]
-                if target == None or (target and target.color != self.turn):
-
-                    if self.turn == 0:
-                        self.white_king = (target_rank, target_file)
-                    else:
-                        self.black_king = (target_rank, target_file)
-
-                    checked, _, _ = self._check_for_pins_and_checks()
-                    if not checked:
-                        move_list.append(
-                            Move(self.position, (rank, file), (target_rank, target_file)))
+        attacked = self._attacked
+        for target_rank, target_file in KING_ATTACKS[rank][file]:
+            target = self.position[target_rank][target_file]
+            if (target is None or target.color != self.turn) and (target_rank, target_file) not in attacked:
+                move_list.append(
+                    Move(self.position, (rank, file), (target_rank, target_file)))
 
-                    if self.turn == 0:
-                        self.white_king = (rank, file)
-                    else:
-                        self.black_king = (rank, file)
+        # the king can not castle out of or through check
+        if (rank, file) in attacked:
+            return
 
         if (self.castle[self.turn][0] and
             self.position[rank][file+1] is None and
             self.position[rank][file+2] is None and
-                self.position[rank][7] is not None):
-            for i in range(1, 3):
-                target_rank, target_file = rank, file + i
-                if self.turn == 0:
-                    self.white_king = (target_rank, target_file)
-                else:
-                    self.black_king = (target_rank, target_file)
-                checked, _, _ = self._check_for_pins_and_checks()
-                if self.turn == 0:
-                    self.white_king = (rank, file)
-                else:
-                    self.black_king = (rank, file)
-                if checked:
-                    break
-                if not checked and i == 2:
-                    move_list.append(
-                        Move(self.position, (rank, file), (rank, file + 2), is_castle=True))
+            self.position[rank][7] is not None and
+            (rank, file+1) not in attacked and
+                (rank, file+2) not in attacked):
+            move_list.append(
+                Move(self.position, (rank, file), (rank, file + 2), is_castle=True))
         if (self.castle[self.turn][1] and
             self.position[rank][file-1] is None and
             self.position[rank][file-2] is None and
             self.position[rank][file-3] is None and
-                self.position[rank][0] is not None):
-            for i in range(1, 3):
-                target_rank, target_file = rank, file - i
-                if self.turn == 0:
-                    self.white_king = (target_rank, target_file)
-                else:
-                    self.black_king = (target_rank, target_file)
-                checked, _, _ = self._check_for_pins_and_checks()
-                if self.turn == 0:
-                    self.white_king = (rank, file)
-                else:
-                    self.black_king = (rank, file)
-                if checked:
-                    break
-                if not checked and i == 2:
-                    move_list.append(
-                        Move(self.position, (rank, file), (rank, file - 2), is_castle=True))
+            self.position[rank][0] is not None and
+            (rank, file-1) not in attacked and
+                (rank, file-2) not in attacked):
+            move_list.append(
+                Move(self.position, (rank, file), (rank, file - 2), is_castle=True))
 
     def _get_queen_moves(self, rank: int, file: int, move_list: list) -> None:
         """Generates all pseudo legal queen moves in the current position and adds them to the given move list.
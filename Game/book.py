@@ -0,0 +1,254 @@
+import os
+import mmap
+import heapq
+import struct
+import argparse
+import tempfile
+from random import choices
+from collections import defaultdict
+from typing import List, Tuple, Iterator
+
+from .settings import *
+from .board import Board
+from .move import Move
+from .pgn import read_pgn
+
+_RECORD = struct.Struct('>QHHI')  # key, move, weight, unused
+_RUN_RECORD = struct.Struct('>QHI')  # key, move, count of the temporary runs of the builder
+_KEY = struct.Struct('>Q')
+
+
+def encode_move(move: Move) -> int:
+    """Encodes a move in 16 bits: the target file and rank, the start file and rank and the piece promoted to, 3 bits each.
+
+    Args:
+        move (Move): the move to encode
+
+    Returns:
+        int: the encoded move
+    """
+    code = move.target_file | move.target_rank << 3 | move.start_file << 6 | move.start_rank << 9
+    if move.is_promotion:
+        code |= move.promotion_choice << 12
+    return code
+
+
+class Book:
+    def __init__(self, path: str = BOOK_FILE) -> None:
+        """Opens an opening book. The file is memory mapped, so only the pages visited by the binary search are read from disk.
+
+        Args:
+            path (str, optional): path of the book file. Defaults to BOOK_FILE.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self.entries = size // BOOK_ENTRY_SIZE
+        # an empty file can not be mapped
+        self._map = mmap.mmap(self._file.fileno(), 0,
+                              access=mmap.ACCESS_READ) if self.entries else None
+
+    def close(self) -> None:
+        """Closes the book file.
+        """
+        if self._map:
+            self._map.close()
+        self._file.close()
+
+    def _find(self, key: int) -> int:
+        """Binary searches the first record with a key that is not lower than the given key.
+
+        Args:
+            key (int): zobrist key of the position
+
+        Returns:
+            int: index of the record
+        """
+        low, high = 0, self.entries
+        while low < high:
+            mid = (low + high) // 2
+            if _KEY.unpack_from(self._map, mid * BOOK_ENTRY_SIZE)[0] < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def get_entries(self, key: int) -> List[Tuple[int, int]]:
+        """Gives the book moves of a position.
+
+        Args:
+            key (int): zobrist key of the position
+
+        Returns:
+            List[Tuple[int, int]]: the encoded moves and their weights
+        """
+        entries = []
+        index = self._find(key) if self.entries else 0
+        while index < self.entries:
+            entry_key, move, weight, _ = _RECORD.unpack_from(
+                self._map, index * BOOK_ENTRY_SIZE)
+            if entry_key != key:
+                break
+            entries.append((move, weight))
+            index += 1
+        return entries
+
+    def get_moves(self, board: Board) -> List[Tuple[Move, int]]:
+        """Gives the legal book moves of the current position of a board.
+
+        Args:
+            board (Board): the board
+
+        Returns:
+            List[Tuple[Move, int]]: the moves and their weights
+        """
+        entries = self.get_entries(board.key)
+        if not entries:
+            return []
+
+        legal_moves = {encode_move(move): move for move in board.get_legal_moves()}
+        return [(legal_moves[code], weight) for code, weight in entries if code in legal_moves]
+
+    def get_move(self, board: Board) -> Move:
+        """Picks a book move for the current position of a board, moves are picked randomly in proportion to their weights.
+
+        Args:
+            board (Board): the board
+
+        Returns:
+            Move: the book move, None if the position is not in the book
+        """
+        moves = [(move, weight) for move, weight in self.get_moves(board) if weight > 0]
+        if not moves:
+            return None
+        return choices([move for move, _ in moves], [weight for _, weight in moves])[0]
+
+
+def _write_run(counts: dict):
+    """Writes counted positions as a sorted run to a temporary file.
+
+    Args:
+        counts (dict): the number of times every (key, move) was played
+
+    Returns:
+        the temporary file
+    """
+    run = tempfile.TemporaryFile()
+    for (key, move), count in sorted(counts.items()):
+        run.write(_RUN_RECORD.pack(key, move, count))
+    run.seek(0)
+    return run
+
+
+def _read_run(run) -> Iterator[Tuple[int, int, int]]:
+    """Reads the records of a temporary run.
+
+    Args:
+        run: the temporary file
+
+    Yields:
+        Iterator[Tuple[int, int, int]]: the key, move and count of every record
+    """
+    while True:
+        data = run.read(_RUN_RECORD.size * 4096)
+        if not data:
+            return
+        yield from _RUN_RECORD.iter_unpack(data)
+
+
+def build_book(pgn_files: List[str], output: str = BOOK_FILE, max_ply: int = BOOK_PLY, min_count: int = 1, chunk: int = BOOK_CHUNK) -> dict:
+    """Builds an opening book from pgn files. The games are streamed and the counted positions are written to sorted temporary runs every chunk positions, which are merged into the book, so memory use does not grow with the number of games.
+
+    Args:
+        pgn_files (List[str]): paths of the pgn files
+        output (str, optional): path the book is written to. Defaults to BOOK_FILE.
+        max_ply (int, optional): number of plies of every game added to the book. Defaults to BOOK_PLY.
+        min_count (int, optional): number of times a move has to be played to be added. Defaults to 1.
+        chunk (int, optional): number of positions counted in memory. Defaults to BOOK_CHUNK.
+
+    Returns:
+        dict: the number of games read and skipped and of the entries written
+    """
+    board = Board(START_FEN)
+    counts = defaultdict(int)
+    runs = []
+    games = skipped = 0
+
+    for path in pgn_files:
+        with open(path) as file:
+            for game in read_pgn(file):
+                board.fen = game['headers'].get('FEN', START_FEN)
+                board.reset()
+                try:
+                    for san in game['moves'][:max_ply]:
+                        move = board.parse_san(san)
+                        counts[(board.key, encode_move(move))] += 1
+                        board.make_move(move)
+                except ValueError:
+                    # the moves before the illegal move are kept
+                    skipped += 1
+                games += 1
+
+                if len(counts) >= chunk:
+                    runs.append(_write_run(counts))
+                    counts.clear()
+
+    runs.append(_write_run(counts))
+    counts.clear()
+
+    entries = 0
+    with open(output, 'wb') as book:
+        last = None
+        total = 0
+        for key, move, count in heapq.merge(*(_read_run(run) for run in runs)):
+            if (key, move) != last:
+                if last and total >= min_count:
+                    book.write(_RECORD.pack(*last, min(total, 0xFFFF), 0))
+                    entries += 1
+                last, total = (key, move), 0
+            total += count
+        if last and total >= min_count:
+            book.write(_RECORD.pack(*last, min(total, 0xFFFF), 0))
+            entries += 1
+
+    for run in runs:
+        run.close()
+
+    return {'games': games, 'skipped': skipped, 'entries': entries}
+
+
+def main(argv: List[str] = None) -> None:
+    """Command line entry point of the book builder, run with python -m Game.book.
+
+    Args:
+        argv (List[str], optional): command line arguments. Defaults to the arguments of the process.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m Game.book', description='Builds an opening book from pgn files or shows the book moves of a position.')
+    parser.add_argument('pgn', nargs='*', help='pgn files the book is built from')
+    parser.add_argument('-o', '--output', default=BOOK_FILE,
+                        help='path of the book')
+    parser.add_argument('--ply', type=int, default=BOOK_PLY,
+                        help='number of plies of every game added to the book')
+    parser.add_argument('--min-count', type=int, default=1,
+                        help='number of times a move has to be played to be added')
+    parser.add_argument('--probe', metavar='FEN',
+                        help='shows the book moves of a position instead of building a book')
+    args = parser.parse_args(argv)
+
+    if args.probe:
+        book = Book(args.output)
+        board = Board(args.probe)
+        for move, weight in sorted(book.get_moves(board), key=lambda entry: -entry[1]):
+            print(f'{board.get_san(move):<8} {weight}')
+        book.close()
+    elif args.pgn:
+        result = build_book(args.pgn, args.output, args.ply, args.min_count)
+        print(
+            f'{result["entries"]} entries from {result["games"]} games ({result["skipped"]} with illegal moves) written to {args.output}')
+    else:
+        parser.error('give pgn files to build a book or --probe')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+from time import perf_counter
+from typing import Tuple
+
+from .settings import *
+
+
+class Clock:
+    def __init__(self, base: float = CLOCK_BASE, increment: float = CLOCK_INCREMENT) -> None:
+        """Initializes the clocks of both players, every player starts with the base time and gets the increment after every move.
+
+        Args:
+            base (float, optional): starting time of every player in seconds. Defaults to CLOCK_BASE.
+            increment (float, optional): time added after every move in seconds. Defaults to CLOCK_INCREMENT.
+        """
+        self.base = base
+        self.increment = increment
+        self.reset()
+
+    def reset(self) -> None:
+        """Resets both clocks to the base time and stops them.
+        """
+        self.times = [float(self.base), float(self.base)]
+        self.running: int = None  # color of the clock that is running
+        self._started = 0.0
+
+    def get_time(self, color: int) -> float:
+        """Gives the remaining time of a player, including the time of the move being thought about.
+
+        Args:
+            color (int): color of the player
+
+        Returns:
+            float: remaining time in seconds, negative when the time has run out
+        """
+        if color == self.running:
+            return self.times[color] - (perf_counter() - self._started)
+        return self.times[color]
+
+    def get_flagged(self) -> int:
+        """Checks if a player has run out of time.
+
+        Returns:
+            int: color of the player that ran out of time, None if no one has
+        """
+        for color in (0, 1):
+            if self.get_time(color) <= 0:
+                return color
+        return None
+
+    def start(self, color: int) -> None:
+        """Stops the running clock and starts the clock of a player, without adding the increment.
+
+        Args:
+            color (int): color of the player
+        """
+        self.stop()
+        self.running = color
+        self._started = perf_counter()
+
+    def stop(self) -> None:
+        """Stops the running clock.
+        """
+        if self.running is not None:
+            self.times[self.running] = self.get_time(self.running)
+            self.running = None
+
+    def press(self, color: int) -> None:
+        """Ends the move of a player, the increment is added to their time and the clock of the other player is started.
+
+        Args:
+            color (int): color of the player that made a move
+        """
+        self.stop()
+        self.times[color] += self.increment
+        self.start((color + 1) % 2)
+
+
+def format_time(seconds: float) -> str:
+    """Converts a remaining time to the text shown on a clock, tenths of seconds are shown in the last 10 seconds.
+
+    Args:
+        seconds (float): remaining time in seconds
+
+    Returns:
+        str: the time, e.g. 4:59 or 0:09.3
+    """
+    seconds = max(0.0, seconds)
+    if seconds < 10:
+        return f'0:{seconds:04.1f}'
+    seconds = int(seconds)
+    return f'{seconds // 60}:{seconds % 60:02d}'
+
+
+def allocate_time(remaining: float, increment: float = 0, move_number: int = 1, moves_to_go: int = None) -> Tuple[float, float]:
+    """Decides how long the engine may think about a move. The remaining time is divided over the moves that are expected to be left in the game, which decrease with the move number, and most of the increment is used as well. The search stops starting new depths after the soft limit and is stopped at the hard limit.
+
+    Args:
+        remaining (float): remaining time of the engine in seconds
+        increment (float, optional): time added after every move in seconds. Defaults to 0.
+        move_number (int, optional): full move number of the game. Defaults to 1.
+        moves_to_go (int, optional): number of moves until the next time control, None if all moves have to be made in the remaining time. Defaults to None.
+
+    Returns:
+        Tuple[float, float]: the soft and hard limit in seconds
+    """
+    # some time is kept back for the overhead of making the move
+    available = max(0.0, remaining - TM_MARGIN)
+    if not moves_to_go:
+        moves_to_go = max(TM_MIN_MOVES_TO_GO, TM_MOVES_TO_GO - move_number // 2)
+
+    soft = available / moves_to_go + increment * TM_INCREMENT_FRACTION
+    hard = min(soft * TM_HARD_FACTOR, available * TM_MAX_FRACTION)
+    soft = min(soft, hard)
+    return max(TM_MIN_TIME, soft), max(TM_MIN_TIME, hard)
@@ -7,17 +7,79 @@ from .support import *
 from .board import Board
 from .piece import Piece
 from .move import Move
+from .stats import SearchStats
+from .book import Book
+from .tablebase import Tablebases
+from .evaluator import Evaluator
 
 class Engine:
-    def __init__(self, board: Board, depth=1) -> None:
+    def __init__(self, board: Board, depth=1, hash_size: int = 16, collect_stats: bool = False, stats_output=None) -> None:
         """Initializes the engine object with a given board and search depth.       
 
         Args:
             board (Board): the board object that the engine uses to generate legal moves
             depth (int, optional): the search depth used to find the best move. Defaults to 1.
+            hash_size (int, optional): size of the transposition table in MB. Defaults to 16.
+            collect_stats (bool, optional): wether to collect a SearchStats object for every search, available as self.stats. Defaults to False.
+            stats_output (optional): file every search's statistics are written to as a json line when collecting statistics. Defaults to None.
         """
         self.board = board
         self.depth = depth
+        self.verbose = True  # prints the time and evaluated positions of prune_search_move
+        self.book: Book = None  # opening book consulted by find_best_move
+        self.tablebases: Tablebases = None  # endgame tables probed by prune_search
+        self.progress = None  # function called with the depth, nodes, time and nps of a running search every INFO_INTERVAL seconds
+        self.evaluator: Evaluator = None  # replaces the heatmap evaluation when set, see set_evaluator
+        self.quiescence = True  # wether the leaves of the search are extended with captures by quiescence_search
+
+        self.collect_stats = collect_stats
+        self.stats_output = stats_output
+        self.stats: SearchStats = None
+
+        self.set_hash_size(hash_size)
+        self.pawn_table = {}  # pawn scores by pawn key, the oldest entry is replaced when it holds PAWN_TABLE_SIZE entries
+
+        self.nodes = 0
+        self.positions_evaluated = 0
+        self._stop = False
+        self._stop_requested = False  # set by stop from another thread, kept until clear_stop so a search that has not started yet stops as well
+        self._deadline = None
+        self._node_limit = None
+        self._t0 = 0.0
+        self._depth = 0
+        self._progress_at = None
+
+    def set_hash_size(self, hash_size: int) -> None:
+        """Sets the size of the transposition table and clears it.
+
+        Args:
+            hash_size (int): size of the transposition table in MB
+        """
+        self.tt_size = max(1, hash_size * 1024 * 1024 // TT_ENTRY_SIZE)
+        self.tt = {}
+
+    def set_evaluator(self, evaluator: Evaluator) -> None:
+        """Replaces the heatmap evaluation by an evaluator, which is attached to the board of the engine. The previous evaluator is closed, and the transposition table is cleared since its values came from the previous evaluation.
+
+        Args:
+            evaluator (Evaluator): the evaluator, None restores the heatmap evaluation
+        """
+        if self.evaluator:
+            self.evaluator.close()
+        self.tt.clear()
+        self.evaluator = evaluator
+        if evaluator:
+            evaluator.attach(self.board)
+
+    def stop(self) -> None:
+        """Stops a running search as soon as possible, the search returns the best move of the last completed depth. A search that has not started yet is stopped as well, until clear_stop is called.
+        """
+        self._stop_requested = True
+
+    def clear_stop(self) -> None:
+        """Allows searching again after stop, called by the thread that starts the next search before starting it.
+        """
+        self._stop_requested = False
 
     def perft(self, depth: int) -> int:
         """Generates all legal moves recursivly to count the number of possible positions up to a given depth
@@ -41,38 +103,102 @@ class Engine:
 
         return number_of_positions
 
-    def perft_range(self, depth: int) -> None:
-        """Does the perft test for every value from 1 to the given depth and prints it to the console
+    def fast_perft(self, depth: int, hash_size: int = 0) -> int:
+        """Counts the number of possible positions up to a given depth like perft, but counts the legal moves at the last ply instead of making them and optionally caches the node count of already visited positions.
+
+        Args:
+            depth (int): search depth
+            hash_size (int, optional): maximum number of (position key, depth) entries kept in the cache, 0 disables the cache. Defaults to 0.
+
+        Returns:
+            int: the total number of positions at the given depth
+        """
+        self._perft_table = {} if hash_size > 0 else None
+        self._perft_table_size = hash_size
+        return self._fast_perft(depth)
+
+    def _fast_perft(self, depth: int) -> int:
+        """Recursive part of fast_perft, uses the cache set up by fast_perft.
+
+        Args:
+            depth (int): search depth
+
+        Returns:
+            int: the total number of positions at the given depth
+        """
+        if depth == 0:
+            return 1
+
+        table = self._perft_table
+        if table is not None and depth > 1:
+            entry = (self.board.key, depth)
+            if entry in table:
+                return table[entry]
+
+        moves = self.board.get_legal_moves()
+        if depth == 1:
+            return len(moves)
+
+        number_of_positions = 0
+        for move in moves:
+            self.board.make_move(move)
+            number_of_positions += self._fast_perft(depth - 1)
+            self.board.unmake_move()
+
+        if table is not None:
+            # the table is bounded by replacing the oldest entry
+            if len(table) >= self._perft_table_size:
+                del table[next(iter(table))]
+            table[entry] = number_of_positions
+
+        return number_of_positions
+
+    def perft_range(self, depth: int) -> List[dict]:
+        """Does the perft test for every value from 1 to the given depth.
 
         Args:
             depth (int): search depth
+
+        Returns:
+            List[dict]: the depth, number of nodes and time in seconds for every depth
         """
-        test = []
+        results = []
         for d in range(1, depth+1):
             t0 = time()
-            new_nop = self.perft(d)
+            nodes = self.perft(d)
             t1 = time()
-            total_time = round(t1 - t0, 3)
-            print(f'depth: {d} \n\t nodes: {new_nop}, time: {total_time}s')
+            results.append(
+                {'depth': d, 'nodes': nodes, 'time': round(t1 - t0, 3)})
 
-    def perft_divide(self, depth: int) -> None:
+        return results
+
+    def perft_divide(self, depth: int, fast: bool = False, hash_size: int = 0) -> dict:
         """Generates all legal moves, then for every move does the perft test for the given depth.
 
         Args:
             depth (int): search depth
+            fast (bool, optional): wether to use fast_perft for the moves. Defaults to False.
+            hash_size (int, optional): cache size used by fast_perft. Defaults to 0.
+
+        Returns:
+            dict: the number of positions at the given depth per move, keyed by the move notation
         """
         moves = self.board.get_legal_moves()
 
+        if fast:
+            self._perft_table = {} if hash_size > 0 else None
+            self._perft_table_size = hash_size
+
         moves_per_move = {}
         for move in moves:
             self.board.make_move(move)
-            moves_per_move[move.move_id_notation] = self.perft(depth-1)
+            if fast:
+                moves_per_move[move.get_notation()] = self._fast_perft(depth-1)
+            else:
+                moves_per_move[move.get_notation()] = self.perft(depth-1)
             self.board.unmake_move()
 
-        for key in moves_per_move:
-            print(f'{key}: {moves_per_move[key]}')
-            
-        print(f'Nodes searched: {self.perft(depth)}')
+        return moves_per_move
 
     def score(self) -> int:
         """Gives a score based on the pieces on the board and their given value.
@@ -81,13 +207,10 @@ class Engine:
             int: the score of the current position
         """
         score = 0
-        for rank in self.board.position:
-            for piece in rank:
-                if piece:
-                    if piece.color == 0:
-                        score += PIECE_VALUE[piece.type]
-                    else:
-                        score -= PIECE_VALUE[piece.type]
+        white_pieces, black_pieces = self.board.pieces
+        for type in range(6):
+            score += PIECE_VALUE[type] * \
+                (len(white_pieces[type]) - len(black_pieces[type]))
 
         return score
 
@@ -97,34 +220,11 @@ class Engine:
         Returns:
             int: knight based score of the current position
         """
-        white_knight_heatmap = [
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [-1, 0, 0, 0, 0, 0, 0, -1],
-            [-1, 0, 1, 1, 1, 1, 0, -1],
-            [-1, 0, 1, 2, 2, 1, 0, -1],
-            [-1, 0, 1, 2, 2, 1, 0, -1],
-            [-1, 0, 1, 1, 1, 1, 0, -1],
-            [-1, 0, 0, 1, 1, 0, 0, -1],
-            [-1, -1, -1, -1, -1, -1, -1, -1]
-        ]
-        black_knight_heatmap = [
-            [-1, -1, -1, -1, -1, -1, -1, -1],
-            [-1, 0, 0, 1, 1, 0, 0, -1],
-            [-1, 0, 1, 1, 1, 1, 0, -1],
-            [-1, 0, 1, 2, 2, 1, 0, -1],
-            [-1, 0, 1, 2, 2, 1, 0, -1],
-            [-1, 0, 1, 1, 1, 1, 0, -1],
-            [-1, 0, 0, 0, 0, 0, 0, -1],
-            [0, 0, 0, 0, 0, 0, 0, 0]
-        ]
         score = 0
-        for i, rank in enumerate(self.board.position):
-            for j, piece in enumerate(rank):
-                if piece and piece.type == 4:
-                    if piece.color == 0:
-                        score += white_knight_heatmap[i][j]
-                    else:
-                        score -= black_knight_heatmap[i][j]
+        for piece in self.board.pieces[0][4]:
+            score += KNIGHT_HEATMAPS[0][piece.rank][piece.file]
+        for piece in self.board.pieces[1][4]:
+            score -= KNIGHT_HEATMAPS[1][piece.rank][piece.file]
 
         return score
 
@@ -134,34 +234,11 @@ class Engine:
         Returns:
             int: bishop based score of the current position
         """
-        white_bishop_heatmap = [
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 1, 1, 0, 0, 0],
-            [0, 0, 1, 2, 2, 1, 0, 0],
-            [0, 1, 2, 1, 1, 2, 1, 0],
-            [0, 2, 1, 0, 0, 1, 2, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0]
-        ]
-        black_bishop_heatmap = [
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 2, 1, 0, 0, 1, 2, 0],
-            [0, 1, 2, 1, 1, 2, 1, 0],
-            [0, 0, 1, 2, 2, 1, 0, 0],
-            [0, 0, 0, 1, 1, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0]
-        ]
         score = 0
-        for i, rank in enumerate(self.board.position):
-            for j, piece in enumerate(rank):
-                if piece and piece.type == 3:
-                    if piece.color == 0:
-                        score += white_bishop_heatmap[i][j]
-                    else:
-                        score -= black_bishop_heatmap[i][j]
+        for piece in self.board.pieces[0][3]:
+            score += BISHOP_HEATMAPS[0][piece.rank][piece.file]
+        for piece in self.board.pieces[1][3]:
+            score -= BISHOP_HEATMAPS[1][piece.rank][piece.file]
 
         return score
 
@@ -171,82 +248,63 @@ class Engine:
         Returns:
             int: king based score of the current position
         """
-        white_king_heatmap = [
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [1, 0, 0, 0, 0, 0, 0, 1],
-            [2, 2, 2, 0, 0, 0, 2, 2]
-        ]
-        black_king_heatmap = [
-            [2, 2, 2, 0, 0, 0, 2, 2],
-            [1, 0, 0, 0, 0, 0, 0, 1],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0]
-        ]
         score = 0
-        for i, rank in enumerate(self.board.position):
-            for j, piece in enumerate(rank):
-                if piece and piece.type == 0:
-                    if piece.color == 0:
-                        score += white_king_heatmap[i][j]
-                    else:
-                        score -= black_king_heatmap[i][j]
+        for piece in self.board.pieces[0][0]:
+            score += KING_HEATMAPS[0][piece.rank][piece.file]
+        for piece in self.board.pieces[1][0]:
+            score -= KING_HEATMAPS[1][piece.rank][piece.file]
 
         return score
 
     def pawn_score(self) -> int:
-        """Gives a score based on the placement of pawn pieces in the current position.
+        """Gives a score based on the placement of pawn pieces in the current position. The score only depends on the pawns, so it is cached in the pawn table by the pawn key of the board and only calculated for new pawn structures.
+
+        Returns:
+            int: pawn based score of the current position
+        """
+        key = self.board.pawn_key
+        score = self.pawn_table.get(key)
+        stats = self.stats
+        if stats is not None:
+            stats.pawn_probes += 1
+            if score is not None:
+                stats.pawn_hits += 1
+        if score is None:
+            score = self._pawn_structure_score()
+            if len(self.pawn_table) >= PAWN_TABLE_SIZE:
+                del self.pawn_table[next(iter(self.pawn_table))]
+            self.pawn_table[key] = score
+        return score
+
+    def _pawn_structure_score(self) -> int:
+        """Calculates the pawn score of the current position, see pawn_score.
 
         Returns:
             int: pawn based score of the current position
         """
-        pawn_heatmap = [
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 1, 2, 2, 1, 0, 0],
-            [0, 0, 1, 2, 2, 1, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0]
-        ]
         score = 0
-        for i, rank in enumerate(self.board.position):
-            for j, piece in enumerate(rank):
-                if piece and piece.type == 5:
-                    if piece.color == 0:
-                        score += pawn_heatmap[i][j]
-                    else:
-                        score -= pawn_heatmap[i][j]
+        for piece in self.board.pieces[0][5]:
+            score += PAWN_HEATMAPS[0][piece.rank][piece.file]
+        for piece in self.board.pieces[1][5]:
+            score -= PAWN_HEATMAPS[1][piece.rank][piece.file]
 
         return score
 
     def evaluate(self) -> float:
-        """Gives an evaluation score of the current position based on all the seperate score functions.
+        """Gives an evaluation score of the current position based on all the seperate score functions, or of the evaluator when one is set.
 
         Returns:
             float: the evaluation score given to the current position
         """
-        evaluation = self.score()
+        if self.evaluator:
+            return self.evaluator.evaluate()
 
-        total_pieces = 0
-        for rank in self.board.position:
-            for piece in rank:
-                if piece:
-                    total_pieces += 1
+        evaluation = self.score()
 
-        evaluation += 0.1 * self.knight_score()
-        evaluation += 0.2 * self.bishop_score()
-        evaluation += 0.4 * self.king_score()
-        evaluation += 0.3 * self.pawn_score()
+        evaluation += KNIGHT_WEIGHT * self.knight_score()
+        evaluation += BISHOP_WEIGHT * self.bishop_score()
+        evaluation += KING_WEIGHT * self.king_score()
+        evaluation += PAWN_WEIGHT * self.pawn_score()
 
         # perspective
         if self.board.turn == 0:
@@ -255,7 +313,7 @@ class Engine:
             return -evaluation
 
     def evaluate_move(self, move: Move) -> int:
-        """Gives a score to a move by estimating how good it is.
+        """Gives a score to a move by estimating how good it is, captures are scored by their static exchange evaluation so captures that lose material are searched after the quiet moves.
 
         Args:
             move (Move): Move to be scored
@@ -265,58 +323,239 @@ class Engine:
         """
         score = 0
         if move.captured:
-            score += PIECE_VALUE[move.captured.type] - \
-                PIECE_VALUE[move.piece.type]
-        
+            score += self.board.static_exchange(move)
+
         if move.is_promotion:
             score += 100
 
         return score
 
-    def order_moves(self) -> List[Move]:
-        """Orders the move based on their score.    
+    def order_moves(self, best_move: Tuple[int, int] = None) -> List[Move]:
+        """Orders the move based on their score, the highest scoring moves first.
+
+        Args:
+            best_move (Tuple[int, int], optional): move_id and promotion choice of a move that should be searched first. Defaults to None.
 
         Returns:
             List[Move]: ordered list of moves
         """
         moves = self.board.get_legal_moves()
-        moves = sorted(moves, key=self.evaluate_move)
+        moves = sorted(moves, key=self.evaluate_move, reverse=True)
+        if best_move:
+            for i, move in enumerate(moves):
+                if (move.move_id, move.promotion_choice) == best_move:
+                    moves.insert(0, moves.pop(i))
+                    break
         return moves
 
-    def prune_search(self, depth: int, alpha: int =-999999, beta: int=999999) -> float:
-        """Finds the best possible evaluation for a given depth using the minimax algorithm with alpha-beta-pruning.
+    def _store(self, depth: int, flag: int, value: float, ply: int, best_move: Move) -> None:
+        """Stores the result of a search in the transposition table, replacing the oldest entry when the table is full.
+
+        Args:
+            depth (int): depth the position was searched to
+            flag (int): wether the value is exact or a lower or upper bound
+            value (float): the value found by the search
+            ply (int): distance from the root, mate scores are stored relative to the position
+            best_move (Move): the best move found, or None
+        """
+        if value >= MATE_BOUND:
+            value += ply
+        elif value <= -MATE_BOUND:
+            value -= ply
+
+        tt = self.tt
+        key = self.board.key
+        if key not in tt and len(tt) >= self.tt_size:
+            del tt[next(iter(tt))]
+        tt[key] = (depth, flag, value,
+                   (best_move.move_id, best_move.promotion_choice) if best_move else None)
+
+    def _start_stats(self) -> None:
+        """Creates the statistics object for a new search when statistics are enabled and times the searching functions.
+        """
+        if self.collect_stats:
+            self.stats = SearchStats()
+            self.stats.instrument(self)
+        else:
+            self.stats = None
+
+    def _finish_stats(self, t0: float) -> None:
+        """Completes the statistics of a finished search and writes them to the statistics output, the timed functions have already been restored.
+
+        Args:
+            t0 (float): start time of the search
+        """
+        if self.stats is not None:
+            self.stats.nodes = self.nodes
+            self.stats.time = time() - t0
+            if self.stats_output:
+                self.stats.emit(self.stats_output)
+
+    def _is_stopped(self) -> bool:
+        """Checks if the search has been stopped or has run out of time or nodes, the limits are only checked every 1024 nodes. The progress of the search is reported at the same time.
+
+        Returns:
+            bool: wether the search should stop
+        """
+        if self._stop:
+            return True
+        if self._stop_requested:
+            self._stop = True
+            return True
+        if self.nodes % 1024 == 0:
+            if self._deadline and time() >= self._deadline:
+                self._stop = True
+            elif self._node_limit and self.nodes >= self._node_limit:
+                self._stop = True
+            if self._progress_at and time() >= self._progress_at:
+                self._report_progress()
+        return self._stop
+
+    def _report_progress(self) -> None:
+        """Calls the progress function with the depth being searched and the nodes searched so far.
+        """
+        elapsed = time() - self._t0
+        self._progress_at = time() + INFO_INTERVAL
+        self.progress({
+            'depth': self._depth,
+            'nodes': self.nodes,
+            'time': elapsed,
+            'nps': round(self.nodes / elapsed) if elapsed > 0 else 0
+        })
+
+    def prune_search(self, depth: int, alpha: int =-999999, beta: int=999999, ply: int = 0) -> float:
+        """Finds the best possible evaluation for a given depth using the minimax algorithm with alpha-beta-pruning and a transposition table.
 
         Args:
             depth (int): search depth
             alpha (int, optional): initial alpha value. Defaults to -999999.
             beta (int, optional): initial beta value. Defaults to 999999.
+            ply (int, optional): distance from the root of the search, used to prefer shorter mates. Defaults to 0.
 
         Returns:
             float: the best evaluation found
         """
+        # a leaf is counted once, by quiescence_search
+        if depth > 0 or not self.quiescence:
+            self.nodes += 1
+        if self._is_stopped():
+            return 0
+
+        stats = self.stats
+        # the tables give the exact result of positions with few pieces, mates are scored like the ones found by the search
+        if self.tablebases and ply > 0:
+            probed = self.tablebases.probe(self.board)
+            if probed:
+                if stats is not None:
+                    stats.tb_hits += 1
+                result, plies = probed
+                return result * (MATE_SCORE - ply - plies)
+
+        # a position that occured before is scored as a draw, the side to move can repeat it
+        if ply > 0 and self.board.is_draw(2):
+            # a checkmate given on the last move before the 50 move rule ends the game, so then the draw needs a legal move
+            if self.board.halfturn < 100 or self.board.get_legal_moves():
+                return 0
+            return -MATE_SCORE + ply if self.board._checked else 0
+
         if depth == 0:
+            if self.quiescence:
+                return self.quiescence_search(alpha, beta)
             self.positions_evaluated += 1
             return self.evaluate()
-        
-        if self.board.halfturn >= 50:
-            return 0
 
-        moves = self.order_moves()
+        best_move = None
+        entry = self.tt.get(self.board.key)
+        if stats is not None:
+            stats.tt_probes += 1
+            if entry:
+                stats.tt_hits += 1
+        if entry:
+            entry_depth, flag, value, best_move = entry
+            if entry_depth >= depth:
+                if value >= MATE_BOUND:
+                    value -= ply
+                elif value <= -MATE_BOUND:
+                    value += ply
+                if flag == TT_EXACT:
+                    return value
+                if flag == TT_LOWER and value >= beta:
+                    return beta
+                if flag == TT_UPPER and value <= alpha:
+                    return alpha
+
+        moves = self.order_moves(best_move)
         if not moves:
             checked, _, _ = self.board._check_for_pins_and_checks()
             if checked:
-                return -999999
+                return -MATE_SCORE + ply
             else:
                 return 0
 
-        for move in moves:
+        flag = TT_UPPER
+        best_move = None
+        for i, move in enumerate(moves):
             self.board.make_move(move)
-            evaluation = -self.prune_search(depth - 1, -beta, -alpha)
+            evaluation = -self.prune_search(depth - 1, -beta, -alpha, ply + 1)
             self.board.unmake_move()
+            if self._stop:
+                return 0
             if evaluation >= beta:
+                if stats is not None:
+                    stats.cutoffs += 1
+                    if i == 0:
+                        stats.first_move_cutoffs += 1
+                self._store(depth, TT_LOWER, beta, ply, move)
                 return beta
-            alpha = max(alpha, evaluation)
+            if evaluation > alpha:
+                alpha = evaluation
+                flag = TT_EXACT
+                best_move = move
+
+        self._store(depth, flag, alpha, ply, best_move)
+        return alpha
+
+    def quiescence_search(self, alpha: float, beta: float) -> float:
+        """Searches the captures of a position until it is quiet, so the evaluation is not taken in the middle of an exchange. The player to move may stand pat on the evaluation instead of capturing, and captures that lose material according to their static exchange evaluation are not searched.
+
+        Args:
+            alpha (float): alpha value
+            beta (float): beta value
 
+        Returns:
+            float: the best evaluation found
+        """
+        self.nodes += 1
+        if self.stats is not None:
+            self.stats.qnodes += 1
+        if self._is_stopped():
+            return 0
+
+        self.positions_evaluated += 1
+        stand_pat = self.evaluate()
+        if stand_pat >= beta:
+            return beta
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        captures = []
+        for move in self.board.get_legal_moves():
+            if move.captured:
+                exchange = self.board.static_exchange(move)
+                if exchange >= 0:
+                    captures.append((exchange, move))
+        captures.sort(key=lambda capture: capture[0], reverse=True)
+
+        for _, move in captures:
+            self.board.make_move(move)
+            evaluation = -self.quiescence_search(-beta, -alpha)
+            self.board.unmake_move()
+            if self._stop:
+                return 0
+            if evaluation >= beta:
+                return beta
+            if evaluation > alpha:
+                alpha = evaluation
         return alpha
 
     def prune_search_move(self, depth: int) -> List[Move]:
@@ -340,34 +579,189 @@ class Engine:
         alpha = -1000000
         beta = 1000000
         
+        self.nodes = 0
         self.positions_evaluated = 0
-
-        for move in moves:
-            self.board.make_move(move)
-            current_eval = -self.prune_search(depth-1, -beta, -alpha)
-            self.board.unmake_move()
-            if current_eval > best_eval:
-                best_eval = current_eval
-                best_moves = [move]
-            if current_eval == best_eval:
-                best_moves.append(move)
+        self._stop = False
+        self._deadline = None
+        self._progress_at = None
+        self._start_stats()
+
+        try:
+            for move in moves:
+                self.board.make_move(move)
+                current_eval = -self.prune_search(depth-1, -beta, -alpha, 1)
+                self.board.unmake_move()
+                if current_eval > best_eval:
+                    best_eval = current_eval
+                    best_moves = [move]
+                elif current_eval == best_eval:
+                    best_moves.append(move)
+        finally:
+            # the timed functions are restored even when the search fails
+            if self.stats is not None:
+                self.stats.release()
 
         t1 = time()
-        print(f'Time: {round(t1 - t0, 3)}s')
-        print(f'Evaluated: {self.positions_evaluated}')
+        if self.stats is not None:
+            self.stats.depth_times.append(t1 - t0)
+            self.stats.depth_nodes.append(self.nodes)
+        self._finish_stats(t0)
+        if self.verbose:
+            print(f'Time: {round(t1 - t0, 3)}s')
+            print(f'Evaluated: {self.positions_evaluated}')
 
         return best_moves
+
+    def get_pv(self, depth: int) -> List[Move]:
+        """Follows the best moves stored in the transposition table from the current position to get the principal variation.
+
+        Args:
+            depth (int): maximum length of the principal variation
+
+        Returns:
+            List[Move]: the principal variation
+        """
+        pv = []
+        for _ in range(depth):
+            entry = self.tt.get(self.board.key)
+            if not entry or not entry[3]:
+                break
+            for move in self.board.get_legal_moves():
+                if (move.move_id, move.promotion_choice) == entry[3]:
+                    pv.append(move)
+                    self.board.make_move(move)
+                    break
+            else:
+                break
+
+        for _ in pv:
+            self.board.unmake_move()
+
+        return pv
+
+    def search(self, depth: int = MAX_DEPTH, time_limit: float = None, callback=None, node_limit: int = None, soft_limit: float = None) -> Move:
+        """Searches the current position with iterative deepening until the given depth is reached, the time or nodes run out or the search is stopped.
+
+        Args:
+            depth (int, optional): maximum search depth. Defaults to MAX_DEPTH.
+            time_limit (float, optional): maximum search time in seconds. Defaults to None.
+            callback (optional): function called with a dict containing the depth, score, nodes, time, nps, pv and statistics (None when disabled) after every completed depth. Defaults to None.
+            node_limit (int, optional): maximum number of nodes, checked every 1024 nodes. Defaults to None.
+            soft_limit (float, optional): time in seconds after which no new depth is started, a part of it when the best move stays the same for TM_STABLE_DEPTHS depths. Defaults to None.
+
+        Returns:
+            Move: the best move found, None if there are no legal moves
+        """
+        t0 = time()
+        self._stop = False
+        self._deadline = t0 + time_limit if time_limit else None
+        self._node_limit = node_limit
+        self._t0 = t0
+        self._progress_at = t0 + INFO_INTERVAL if self.progress else None
+        self.nodes = 0
+        self.positions_evaluated = 0
+
+        moves = self.order_moves()
+        if not moves:
+            return None
+
+        self._start_stats()
+        try:
+            best_move = moves[0]
+            previous_best = None
+            stable = 0
+            previous_time = 0.0
+            for current_depth in range(1, depth + 1):
+                self._depth = current_depth
+                depth_t0 = time()
+                depth_nodes = self.nodes
+                alpha = -1000000
+                beta = 1000000
+                iteration_best = None
+                for move in moves:
+                    self.board.make_move(move)
+                    evaluation = -self.prune_search(current_depth - 1, -beta, -alpha, 1)
+                    self.board.unmake_move()
+                    if self._stop:
+                        break
+                    if evaluation > alpha:
+                        alpha = evaluation
+                        iteration_best = move
+
+                # a depth that was not completed is only used when it already found a better move than the previous depth's best move
+                if self._stop and (iteration_best is None or iteration_best is best_move):
+                    break
+                if iteration_best is None:
+                    iteration_best = moves[0]
+                best_move = iteration_best
+                if self._stop:
+                    break
+                stable = stable + 1 if best_move is previous_best else 0
+                previous_best = best_move
+                self._store(current_depth, TT_EXACT, alpha, 0, best_move)
+
+                moves.insert(0, moves.pop(moves.index(best_move)))
+                elapsed = time() - t0
+                depth_time = time() - depth_t0
+                if self.stats is not None:
+                    self.stats.depth_times.append(depth_time)
+                    self.stats.depth_nodes.append(self.nodes - depth_nodes)
+                if callback:
+                    callback({
+                        'depth': current_depth,
+                        'score': alpha,
+                        'nodes': self.nodes,
+                        'time': elapsed,
+                        'nps': round(self.nodes / elapsed) if elapsed > 0 else 0,
+                        'pv': self.get_pv(current_depth),
+                        'stats': self.stats
+                    })
+
+                # no need to search deeper when a forced mate has been found
+                if abs(alpha) >= MATE_BOUND:
+                    break
+
+                # a move that stays the best for several depths is unlikely to change, so its time is saved for later moves
+                if soft_limit:
+                    limit = soft_limit * TM_STABLE_FRACTION if stable >= TM_STABLE_DEPTHS else soft_limit
+                    if elapsed >= limit:
+                        break
+                    # a depth that would not finish before the hard limit is not started, the next depth is expected to grow as much as the last one did
+                    if time_limit and previous_time and elapsed + depth_time * depth_time / previous_time > time_limit:
+                        break
+                    previous_time = depth_time
+        finally:
+            self._deadline = None
+            self._node_limit = None
+            self._progress_at = None
+            if self.stats is not None:
+                self.stats.release()
+        self._finish_stats(t0)
+        return best_move
     
-    def find_best_move(self) -> Move:
-        """Generates a best move by randomly picking a move from the list of best moves generated by the prune_search_move function.
+    def find_best_move(self, callback=None, time_limit: float = None, soft_limit: float = None) -> Move:
+        """Generates a best move by randomly picking a move from the list of best moves generated by the prune_search_move function. When the position is in the opening book a book move is played without searching.
+
+        Args:
+            callback (optional): when given the position is searched with iterative deepening by the search function instead, which calls it after every completed depth. Defaults to None.
+            time_limit (float, optional): hard time limit in seconds, when given the search is limited by time instead of self.depth. Defaults to None.
+            soft_limit (float, optional): soft time limit in seconds, see search. Defaults to None.
 
         Returns:
             Move: random best move
         """
+        if self.book:
+            book_move = self.book.get_move(self.board)
+            if book_move:
+                return book_move
+
+        if callback or time_limit:
+            depth = MAX_DEPTH if time_limit else self.depth
+            return self.search(depth, time_limit, callback, soft_limit=soft_limit)
+
         best_moves = self.prune_search_move(self.depth)
         if best_moves:
             random_best_move = choice(best_moves)
             return random_best_move
 
         return None
- 
\ No newline at end of file
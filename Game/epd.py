@@ -0,0 +1,73 @@
+from typing import Tuple, Iterator
+
+
+def parse_epd(line: str) -> Tuple[str, dict]:
+    """Parses a line containing a fen string or an epd record. An epd record contains the first 4 fields of a fen string followed by operations like "bm Nf3; id "test 1";", a full fen string can be followed by operations too.
+
+    Args:
+        line (str): the fen or epd line
+
+    Returns:
+        Tuple[str, dict]: a full fen string and the operations with their list of operands
+    """
+    fields = line.strip().split(maxsplit=4)
+    position = ' '.join(fields[:4])
+    rest = fields[4] if len(fields) > 4 else ''
+
+    # a fen string has the half and full turn numbers, which can be followed by operations as well
+    counters = None
+    tokens = rest.split(maxsplit=2)
+    if len(tokens) >= 2 and tokens[0].isdigit() and tokens[1].isdigit():
+        counters = tokens[:2]
+        rest = tokens[2] if len(tokens) > 2 else ''
+
+    operations = {}
+    for operation in _split_operations(rest):
+        tokens = operation.split(maxsplit=1)
+        if not tokens:
+            continue
+        operands = tokens[1] if len(tokens) > 1 else ''
+        if operands.startswith('"') and operands.endswith('"'):
+            operations[tokens[0]] = [operands[1:-1]]
+        else:
+            operations[tokens[0]] = operands.split()
+
+    halfturn, fullturn = counters or (operations.get('hmvc', ['0'])[0], operations.get('fmvn', ['1'])[0])
+    return f'{position} {halfturn} {fullturn}', operations
+
+
+def _split_operations(text: str) -> Iterator[str]:
+    """Splits the operations of an epd record on semicolons that are not inside quotes.
+
+    Args:
+        text (str): the operations part of the record
+
+    Yields:
+        Iterator[str]: the separate operations
+    """
+    start = 0
+    quoted = False
+    for i, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif char == ';' and not quoted:
+            yield text[start:i].strip()
+            start = i + 1
+    if text[start:].strip():
+        yield text[start:].strip()
+
+
+def read_epd(file) -> Iterator[Tuple[int, str, dict]]:
+    """Lazily reads fen or epd lines from a file, skipping empty lines and comments starting with #.
+
+    Args:
+        file: an open text file
+
+    Yields:
+        Iterator[Tuple[int, str, dict]]: the line number, fen string and operations of every position
+    """
+    for number, line in enumerate(file, 1):
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        fen, operations = parse_epd(line)
+        yield number, fen, operations
@@ -0,0 +1,59 @@
+from abc import ABC, abstractmethod
+
+from .board import Board
+from .move import Move
+
+
+class Evaluator(ABC):
+    def __init__(self) -> None:
+        """Base of the evaluators that can replace the heatmap evaluation of an engine with Engine.set_evaluator. An attached evaluator is told by its board about every move that is made and unmade, so it can keep incremental state instead of looking at the whole position for every evaluation.
+        """
+        self.board: Board = None
+
+    def attach(self, board: Board) -> None:
+        """Attaches the evaluator to a board.
+
+        Args:
+            board (Board): the board that is evaluated
+        """
+        self.board = board
+        board.observers.append(self)
+        self.reset()
+
+    def detach(self) -> None:
+        """Detaches the evaluator from its board.
+        """
+        if self.board:
+            self.board.observers.remove(self)
+            self.board = None
+
+    def close(self) -> None:
+        """Detaches the evaluator and releases what it holds, called by the engine when the evaluator is replaced.
+        """
+        self.detach()
+
+    def reset(self) -> None:
+        """Called when the board has been set up from its fen string, the evaluator has to recompute its state from the position.
+        """
+
+    def make_move(self, move: Move) -> None:
+        """Called after a move has been made on the board.
+
+        Args:
+            move (Move): the move that was made
+        """
+
+    def unmake_move(self, move: Move) -> None:
+        """Called after a move has been unmade on the board.
+
+        Args:
+            move (Move): the move that was unmade
+        """
+
+    @abstractmethod
+    def evaluate(self) -> float:
+        """Evaluates the current position of the board, every evaluator has to implement it.
+
+        Returns:
+            float: the evaluation in pawns from the perspective of the player to move
+        """
@@ -1,12 +1,15 @@
 import pygame
+from time import time
+from textwrap import wrap
 from pygame import gfxdraw
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 from .settings import *
 from .support import *
 from .board import Board
 from .piece import Piece
 from .move import Move
+from .clock import Clock, format_time
 
 pygame.font.init()
 font = pygame.font.SysFont('monospace', SQUARE_SIZE//4)
@@ -23,18 +26,31 @@ class Interface:
         """
         self.win = win
         self.board = board
+        self.clock = Clock(CLOCK_BASE, CLOCK_INCREMENT) if CLOCK_BASE else None
+        self.background = self.draw_background()
         self.reset()
 
     def reset(self) -> None:
         """Resets the interface object to start a new game.
         """
         self.board.reset()
+        if self.clock:
+            self.clock.reset()
 
         self.player = 0
         self.selected = None
-        self.legal_moves = self.board.get_legal_moves()
-        self.selected_moves = self.get_selected_legal_moves()
-        self.fen_list = []
+        self.promotion: List[Move] = None  # promotion moves that wait for the piece to be chosen
+        self.update_legal_moves()
+        self.get_selected_legal_moves()
+
+        # what is drawn on every square, only squares that differ from it are drawn again
+        self.rendered = [[None for _ in range(8)] for _ in range(8)]
+        self.changed = True
+        self.ended = False
+
+        # moves of the game in standard algebraic notation and the latest search info shown next to the board
+        self.san_log: List[str] = []
+        self.clear_info()
 
         self.draw()
 
@@ -47,15 +63,20 @@ class Interface:
         Returns:
             bool: if the selection was successfull, a selection is successfull when a move is made
         """
+        self.changed = True
+        # while the promotion dialog is open a click can only choose the piece
+        if self.promotion:
+            return self.choose_promotion(target)
+
         if True:
             if self.selected:
                 piece = self.board.position[self.selected[0]][self.selected[1]]
                 if piece and piece.color == self.board.turn:
                     result = self.move(self.selected, target)
-                    if result:
+                    if result or self.promotion:
                         self.selected = None
                         self.get_selected_legal_moves()
-                        return True
+                        return result
                     else:
                         self.selected = None
                         self.select(target)
@@ -77,118 +98,244 @@ class Interface:
             clicked (Tuple[int, int]): clicked square, 2nd clicked
 
         Returns:
-            bool: success of the tried move
+            bool: success of the tried move, a promotion is made once the piece is chosen
         """
-        move = Move(self.board.position, selected, clicked)
-        move_made = False
-        for legal_move in self.legal_moves:
-            if move == legal_move:
-                if legal_move.is_promotion:
-                    legal_move.promotion_choice = self.ask_promotion()
-                self.make_move(legal_move)
-                return True
+        moves = self.moves_by_square.get(selected, {}).get(clicked)
+        if not moves:
+            return False
 
-        return False
+        if moves[0].is_promotion:
+            self.promotion = moves
+            return False
+        self.make_move(moves[0])
+        return True
 
     def make_move(self, move: Move) -> None:
-        """Executes a given move on the board object and updates the legal moves and the fen string list.
+        """Executes a given move on the board object and updates the legal moves.
 
         Args:
             move (Move): the move to be made
         """
+        self.san_log.append(self.board.get_san(move, self.legal_moves))
+        if self.clock:
+            self.clock.press(self.board.turn)
         self.board.make_move(move)
-        self.fen_list.append(self.board.get_fen().split(' ')[0:4])
-        self.legal_moves = self.board.get_legal_moves()
+        self.update_legal_moves()
+        self.changed = True
+        self.info_changed = True
+        self.info_time = 0.0
 
     def unmake_move(self) -> None:
-        """Unmakes the last move made on the board object, updatest the legal moves and the fen list.
+        """Unmakes the last move made on the board object and updates the legal moves, an open promotion dialog is closed instead.
         """
+        self.changed = True
+        if self.promotion:
+            self.promotion = None
+            return
+        if self.board.move_log:
+            self.san_log.pop()
         self.board.unmake_move()
-        self.fen_list.pop()
-        self.legal_moves = self.board.get_legal_moves()
+        self.update_legal_moves()
+        # the time used is not given back, the clock of the player to move runs again
+        if self.clock and self.clock.running is not None:
+            self.clock.start(self.board.turn)
+        self.info_changed = True
+        self.info_time = 0.0
+
+    def choose_promotion(self, target: Tuple[int, int]) -> bool:
+        """Handles a click while the promotion dialog is open, clicking one of its pieces makes the promotion. Other clicks are ignored, the dialog stays open until a piece is chosen.
 
-    def ask_promotion(self) -> int:
-        """Ask for promotion choice from the player.
+        Args:
+            target (Tuple[int, int]): the clicked square
 
         Returns:
-            int: promotion choice made by player
+            bool: wether the promotion was made
         """
-        for rank in (3, 4):
-            for file in (3, 4):
-                gfxdraw.box(
-                    self.win, (file*SQUARE_SIZE, rank*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE), BG)
-                x = SQUARE_SIZE*file + (SQUARE_SIZE - PIECE_SIZE)/2
-                y = SQUARE_SIZE*rank + (SQUARE_SIZE - PIECE_SIZE)/2
-                if rank == 3 and file == 3:
-                    self.win.blit(IMGS[1][self.board.turn], (x, y))
-                elif rank == 3 and file == 4:
-                    self.win.blit(IMGS[2][self.board.turn], (x, y))
-                elif rank == 4 and file == 3:
-                    self.win.blit(IMGS[3][self.board.turn], (x, y))
-                elif rank == 4 and file == 4:
-                    self.win.blit(IMGS[4][self.board.turn], (x, y))
-        pygame.display.update()
-
-        clock = pygame.time.Clock()
-        while True:
-            clock.tick(FPS)
-            for event in pygame.event.get():
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    pos = pygame.mouse.get_pos()
-                    x, y = pos
-                    rank, file = get_row_col_from_mouse(pos)
-                    if rank == 3 and file == 3:
-                        return 1
-                    elif rank == 3 and file == 4:
-                        return 2
-                    elif rank == 4 and file == 3:
-                        return 3
-                    elif rank == 4 and file == 4:
-                        return
-                    else:  # if no piece was selected, ask again until a selection is made
-                        return self.ask_promotion()
-
-    def draw(self) -> None:
-        """Draw the board and pieces on screen along with the selected square, legal moves, the last move made and the end game message in case the game is over.
+        choice = PROMOTION_SQUARES.get(target)
+        if choice is None:
+            return False
+
+        move = next(move for move in self.promotion if move.promotion_choice == choice)
+        self.promotion = None
+        self.make_move(move)
+        return True
+
+    def draw_promotion(self) -> pygame.Rect:
+        """Draws the promotion dialog, the pieces that can be promoted to on the 4 middle squares.
+
+        Returns:
+            pygame.Rect: the area of the screen that was drawn
         """
-        self.draw_squares()
-        self.draw_pieces(self.board.position)
-        self.highlight_selected()
-        self.highlight_legal_moves()
-        self.highlight_last_move()
-        self.end_game()
-        pygame.display.update()
-
-    def draw_squares(self) -> None:
-        """Draws the squares of the board including notation along the edges.
+        for (rank, file), choice in PROMOTION_SQUARES.items():
+            gfxdraw.box(
+                self.win, (file*SQUARE_SIZE, rank*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE), BG)
+            x = SQUARE_SIZE*file + (SQUARE_SIZE - PIECE_SIZE)/2
+            y = SQUARE_SIZE*rank + (SQUARE_SIZE - PIECE_SIZE)/2
+            self.win.blit(IMGS[choice][self.board.turn], (x, y))
+            self.rendered[rank][file] = None
+        return pygame.Rect(3*SQUARE_SIZE, 3*SQUARE_SIZE, 2*SQUARE_SIZE, 2*SQUARE_SIZE)
+
+    def draw(self) -> bool:
+        """Draws the squares that changed since the last call, with the selected square, legal moves and the last move made, and the end game message in case the game is over. Only the changed parts of the screen are updated and nothing is drawn when the game did not change.
+
+        Returns:
+            bool: wether the game has ended
         """
+        # running out of time ends the game without a change on the board
+        if self.clock and not self.ended and self.clock.get_flagged() is not None:
+            self.changed = True
+
+        self.draw_info()
+        if not self.changed:
+            return self.ended
+        self.changed = False
+
+        targets = self.legal_moves_piece
+        last_move = set()
+        if self.board.move_log:
+            move: Move = self.board.move_log[-1]
+            last_move = {(move.start_rank, move.start_file), (move.target_rank, move.target_file)}
+
+        rects = []
+        for rank in range(8):
+            for file in range(8):
+                piece: Piece = self.board.position[rank][file]
+                state = ((piece.type, piece.color) if piece else None,
+                         self.selected == (rank, file), (rank, file) in targets, (rank, file) in last_move)
+                if self.rendered[rank][file] != state:
+                    self.rendered[rank][file] = state
+                    rects.append(self.draw_square(rank, file, state))
+
+        if self.promotion:
+            rects.append(self.draw_promotion())
+
+        self.ended = self.end_game()
+        if self.ended:
+            # the message covers the middle squares, so they are drawn again once it is gone
+            for rank in range(1, 7):
+                for file in range(1, 7):
+                    self.rendered[rank][file] = None
+            rects.append(pygame.Rect(
+                1*SQUARE_SIZE, 1*SQUARE_SIZE, 6*SQUARE_SIZE, 6*SQUARE_SIZE))
+
+        if rects:
+            pygame.display.update(rects)
+        return self.ended
+
+    def clear_info(self) -> None:
+        """Clears the search info, done when a new search starts.
+        """
+        self.info = {}
+        self.info_changed = True
+        self.info_time = 0.0
+
+    def update_info(self, info: dict) -> None:
+        """Adds an update of a running search to the search info, it is drawn by draw_info.
+
+        Args:
+            info (dict): any of the depth, score from white's perspective, nodes, nps and principal variation in standard algebraic notation
+        """
+        self.info.update(info)
+        self.info_changed = True
+
+    def draw_info(self) -> bool:
+        """Draws the panel next to the board with the search info and the moves of the game. Search updates are drawn at most every INFO_INTERVAL seconds, so drawing does not slow the search down.
+
+        Returns:
+            bool: wether the panel was drawn
+        """
+        # a running clock changes the panel without an update
+        running = self.clock and self.clock.running is not None
+        if not UI_WIDTH or not (self.info_changed or running) or time() < self.info_time + INFO_INTERVAL:
+            return False
+        self.info_changed = False
+        self.info_time = time()
+
+        line_width = (UI_WIDTH - SQUARE_SIZE//4) // font.size(' ')[0]
+        info = self.info
+        lines = []
+        if self.clock:
+            lines += [f'{COLORS[color]:<6} {format_time(self.clock.get_time(color))}' for color in (0, 1)] + ['']
+        lines += [
+            f'Depth  {info.get("depth", "-")}',
+            f'Score  {format_evaluation(info["score"]) if "score" in info else "-"}',
+            f'Nodes  {info.get("nodes", "-")}',
+            f'NPS    {info.get("nps", "-")}',
+            '',
+            'PV'
+        ] + wrap(' '.join(info.get('pv', [])), line_width) + ['', 'Moves']
+
+        # only the last moves that fit in the panel are shown
+        fen = self.board.fen.split(' ')
+        fullturn = int(fen[5]) if len(fen) > 5 else 1
+        move_lines = []
+        if len(fen) > 1 and fen[1] == 'b' and self.san_log:
+            move_lines.append(f'{fullturn}. ... {self.san_log[0]}')
+            fullturn += 1
+        start = len(move_lines)
+        for i in range(start, len(self.san_log), 2):
+            move_lines.append(f'{fullturn}. {" ".join(self.san_log[i:i + 2])}')
+            fullturn += 1
+        line_height = font.get_linesize()
+        visible = SCREEN_SIZE // line_height - len(lines) - 1
+        lines += move_lines[-visible:] if visible > 0 else []
+
+        rect = pygame.Rect(SCREEN_SIZE, 0, UI_WIDTH, SCREEN_SIZE)
+        self.win.fill(WHITE, rect)
+        for i, line in enumerate(lines):
+            img = font.render(line, True, (0, 0, 0))
+            self.win.blit(img, (SCREEN_SIZE + SQUARE_SIZE//8, SQUARE_SIZE//8 + i*line_height))
+        pygame.display.update(rect)
+        return True
+
+    def draw_background(self) -> pygame.Surface:
+        """Draws the squares of the board including notation along the edges once, the squares are copied from it when they are drawn.
+
+        Returns:
+            pygame.Surface: the empty board
+        """
+        background = pygame.Surface((SCREEN_SIZE, SCREEN_SIZE))
         for rank in range(8):
             for file in range(rank % 2, 8, 2):
                 pygame.draw.rect(
-                    self.win, WHITE, (file*SQUARE_SIZE, rank*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+                    background, WHITE, (file*SQUARE_SIZE, rank*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
             for file in range((rank+1) % 2, 8, 2):
                 pygame.draw.rect(
-                    self.win, BLACK, (file*SQUARE_SIZE, rank*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+                    background, BLACK, (file*SQUARE_SIZE, rank*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
 
         for i in range(8):
             img = font.render(f'{pos_to_not(i, 0)}', True, (0, 0, 0))
-            self.win.blit(img, (0*SQUARE_SIZE + 0.71 *
-                                SQUARE_SIZE, i*SQUARE_SIZE + 0.77*SQUARE_SIZE))
+            background.blit(img, (0*SQUARE_SIZE + 0.71 *
+                                  SQUARE_SIZE, i*SQUARE_SIZE + 0.77*SQUARE_SIZE))
             img = font.render(f'{pos_to_not(7, i)}', True, (0, 0, 0))
-            self.win.blit(img, (i*SQUARE_SIZE + 0.71 *
-                                SQUARE_SIZE, 7*SQUARE_SIZE + 0.77*SQUARE_SIZE))
+            background.blit(img, (i*SQUARE_SIZE + 0.71 *
+                                  SQUARE_SIZE, 7*SQUARE_SIZE + 0.77*SQUARE_SIZE))
+        return background
 
-    def draw_pieces(self, position: List[List[Piece]]) -> None:
-        """Draws all the pieces in the current position.
+    def draw_square(self, rank: int, file: int, state: tuple) -> pygame.Rect:
+        """Draws a single square with its highlights and piece.
 
         Args:
-            position (List[List[Piece]]): current board position
+            rank (int): rank of the square
+            file (int): file of the square
+            state (tuple): type and color of the piece or None and wether the square is selected, a legal move and part of the last move
+
+        Returns:
+            pygame.Rect: the area of the screen that was drawn
         """
-        for rank in range(8):
-            for file in range(8):
-                piece: Piece = position[rank][file]
-                if piece:
-                    piece.draw(self.win)
+        piece, selected, legal, last = state
+        rect = pygame.Rect(file*SQUARE_SIZE, rank*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+        self.win.blit(self.background, rect, rect)
+        if selected:
+            gfxdraw.box(self.win, rect, YELLOW)
+        if legal:
+            gfxdraw.box(self.win, rect, RED)
+        if last:
+            gfxdraw.box(self.win, rect, ORANGE)
+        if piece:
+            self.win.blit(IMGS[piece[0]][piece[1]], (rect.x + (SQUARE_SIZE - PIECE_SIZE)/2,
+                                                     rect.y + (SQUARE_SIZE - PIECE_SIZE)/2))
+        return rect
 
     def end_game(self) -> bool:
         """Checks if the game has ended and displays a corresponding message if it has ended.
@@ -196,100 +343,47 @@ class Interface:
         Returns:
             bool: wether the game has ended
         """
-
-        # no moves
-        if not self.legal_moves:
-            background_rect = pygame.Rect(
-                1*SQUARE_SIZE, 1*SQUARE_SIZE, 6*SQUARE_SIZE, 6*SQUARE_SIZE)
-            gfxdraw.box(self.win, background_rect, BG)
-
-            checked, _, _ = self.board._check_for_pins_and_checks()
-            if checked:
-                img = font_text.render(
-                    f'{COLORS[(self.board.turn + 1) % 2]} has won', True, (0, 0, 0))
-                self.win.blit(img, (SCREEN_SIZE//2 - 0.5*img.get_width(),
-                              SCREEN_SIZE//2 - 0.5*img.get_height()))
-            else:
-                img = font_text.render(f'Stalemate', True, (0, 0, 0))
-                self.win.blit(img, (SCREEN_SIZE//2 - 0.5*img.get_width(),
-                              SCREEN_SIZE//2 - 0.5*img.get_height()))
-
-            img = font_text.render(
-                f'Press "r" to reset the game', True, (0, 0, 0))
-            self.win.blit(img, (SCREEN_SIZE//2 - 0.5*img.get_width(),
-                          SCREEN_SIZE//2 - 0.5*img.get_height() + SQUARE_SIZE))
-            return True
-
-        # 50 move rule
-        if self.board.halfturn >= 50:
-            background_rect = pygame.Rect(
-                1*SQUARE_SIZE, 1*SQUARE_SIZE, 6*SQUARE_SIZE, 6*SQUARE_SIZE)
-            gfxdraw.box(self.win, background_rect, BG)
-
-            img = font_text.render(f'Draw by 50 move rule', True, (0, 0, 0))
-            self.win.blit(img, (SCREEN_SIZE//2 - 0.5*img.get_width(),
-                          SCREEN_SIZE//2 - 0.5*img.get_height()))
-
-            img = font_text.render(
-                f'Press "r" to reset the game', True, (0, 0, 0))
-            self.win.blit(img, (SCREEN_SIZE//2 - 0.5*img.get_width(),
-                          SCREEN_SIZE//2 - 0.5*img.get_height() + SQUARE_SIZE))
-            return True
-
-        # 3 fold repetition
-        if any([self.fen_list.count(i) > 2 for i in self.fen_list]):
-            background_rect = pygame.Rect(
-                1*SQUARE_SIZE, 1*SQUARE_SIZE, 6*SQUARE_SIZE, 6*SQUARE_SIZE)
-            gfxdraw.box(self.win, background_rect, BG)
-
-            img = font_text.render(f'Draw by repetition', True, (0, 0, 0))
-            self.win.blit(img, (SCREEN_SIZE//2 - 0.5*img.get_width(),
-                          SCREEN_SIZE//2 - 0.5*img.get_height()))
-
-            img = font_text.render(
-                f'Press "r" to reset the game', True, (0, 0, 0))
-            self.win.blit(img, (SCREEN_SIZE//2 - 0.5*img.get_width(),
-                          SCREEN_SIZE//2 - 0.5*img.get_height() + SQUARE_SIZE))
-            return True
-
-        return False
-
-    def highlight_selected(self) -> None:
-        """Highlights the selected square
+        state = self.board.game_state()
+        flagged = self.clock.get_flagged() if self.clock else None
+        if flagged is not None and state == 'ongoing':
+            state = 'time'
+        if state == 'ongoing':
+            return False
+        if self.clock:
+            self.clock.stop()
+
+        background_rect = pygame.Rect(
+            1*SQUARE_SIZE, 1*SQUARE_SIZE, 6*SQUARE_SIZE, 6*SQUARE_SIZE)
+        gfxdraw.box(self.win, background_rect, BG)
+
+        if state == 'checkmate':
+            message = f'{COLORS[(self.board.turn + 1) % 2]} has won'
+        elif state == 'time':
+            message = f'{COLORS[(flagged + 1) % 2]} has won on time'
+        elif state == 'stalemate':
+            message = 'Stalemate'
+        else:
+            message = f'Draw by {state}'
+        img = font_text.render(message, True, (0, 0, 0))
+        self.win.blit(img, (SCREEN_SIZE//2 - 0.5*img.get_width(),
+                      SCREEN_SIZE//2 - 0.5*img.get_height()))
+
+        img = font_text.render(
+            f'Press "r" to reset the game', True, (0, 0, 0))
+        self.win.blit(img, (SCREEN_SIZE//2 - 0.5*img.get_width(),
+                      SCREEN_SIZE//2 - 0.5*img.get_height() + SQUARE_SIZE))
+        return True
+
+    def update_legal_moves(self) -> None:
+        """Generates the legal moves of the current position and indexes them by start and target square, so selecting, highlighting and validating moves are lookups. The 4 moves of a promotion share their squares and are grouped.
         """
-        if self.selected:
-            rank, file = self.selected
-            gfxdraw.box(
-                self.win, (file*SQUARE_SIZE, rank*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE), YELLOW)
-            piece = self.board.position[rank][file]
-            if piece:
-                piece.draw(self.win)
-
-    def highlight_legal_moves(self) -> None:
-        """Highlights the legal moves possible by the piece on the selected square.
-        """
-        if self.legal_moves_piece:
-            for move in self.legal_moves_piece:
-                gfxdraw.box(self.win, (move.target_file*SQUARE_SIZE,
-                                       move.target_rank*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE), RED)
-                piece = self.board.position[move.target_rank][move.target_file]
-                if piece:
-                    piece.draw(self.win)
-
-    def highlight_last_move(self) -> None:
-        """Highlights the last move made.
-        """
-        if self.board.move_log:
-            last_move: Move = self.board.move_log[-1]
-            gfxdraw.box(self.win, (last_move.start_file*SQUARE_SIZE,
-                                   last_move.start_rank*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE), ORANGE)
-            gfxdraw.box(self.win, (last_move.target_file*SQUARE_SIZE,
-                                   last_move.target_rank*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE), ORANGE)
-
-            last_move.piece.draw(self.win)
+        self.legal_moves = self.board.get_legal_moves()
+        self.moves_by_square: Dict[Tuple[int, int], Dict[Tuple[int, int], List[Move]]] = {}
+        for move in self.legal_moves:
+            targets = self.moves_by_square.setdefault((move.start_rank, move.start_file), {})
+            targets.setdefault((move.target_rank, move.target_file), []).append(move)
 
     def get_selected_legal_moves(self) -> None:
-        """Generates a list of all legal moves for the selected piece.
+        """Looks up the legal moves of the selected piece by their target square.
         """
-        self.legal_moves_piece = [move for move in self.legal_moves if (
-            move.start_rank, move.start_file) == self.selected]
+        self.legal_moves_piece = self.moves_by_square.get(self.selected, {})
@@ -0,0 +1,256 @@
+import math
+import argparse
+from datetime import date
+from multiprocessing import Pool
+from typing import List, Tuple
+
+from .settings import *
+from .board import Board
+from .engine import Engine
+from .epd import read_epd
+from . import pgn
+
+RESULTS = ['1-0', '0-1', '1/2-1/2']
+
+
+def parse_config(text: str) -> dict:
+    """Parses an engine configuration like "depth=3,movetime=0.5,hash=16". Keys other than depth, movetime, nodes and hash set the engine attribute of the same name, so feature flags can be switched per engine.
+
+    Args:
+        text (str): comma separated key=value pairs
+
+    Returns:
+        dict: the configuration
+    """
+    config = {}
+    for pair in text.split(','):
+        if not pair.strip():
+            continue
+        key, value = pair.split('=')
+        value = value.strip()
+        if value.lower() in ('true', 'false'):
+            config[key.strip()] = value.lower() == 'true'
+        else:
+            try:
+                config[key.strip()] = int(value)
+            except ValueError:
+                config[key.strip()] = float(value)
+    return config
+
+
+def create_engine(board: Board, config: dict) -> Engine:
+    """Creates an engine for a board according to a configuration.
+
+    Args:
+        board (Board): the board of the game
+        config (dict): configuration given by parse_config
+
+    Returns:
+        Engine: the configured engine
+    """
+    engine = Engine(board, config.get('depth', 3), config.get('hash', 16))
+    engine.verbose = False
+    for key, value in config.items():
+        if key not in ('depth', 'movetime', 'nodes', 'hash'):
+            if not hasattr(engine, key):
+                raise ValueError(f'unknown engine option: {key}')
+            setattr(engine, key, value)
+    return engine
+
+
+def get_game_result(board: Board) -> Tuple[str, str]:
+    """Checks if the game has ended with Board.game_state.
+
+    Args:
+        board (Board): the board of the game
+
+    Returns:
+        Tuple[str, str]: the result and the reason the game ended, None if the game has not ended
+    """
+    state = board.game_state()
+    if state == 'ongoing':
+        return None
+    if state == 'checkmate':
+        return RESULTS[(board.turn + 1) % 2], state
+    return RESULTS[2], state
+
+
+def play_game(task: Tuple[int, str, dict, dict]) -> dict:
+    """Plays a single game between two engine configurations.
+
+    Args:
+        task (Tuple[int, str, dict, dict]): the game number, opening fen and the configurations of white and black
+
+    Returns:
+        dict: the game number, opening, moves in standard algebraic notation, result and reason the game ended
+    """
+    number, fen, white, black = task
+    board = Board(fen)
+    configs = [white, black]
+    engines = [create_engine(board, white), create_engine(board, black)]
+
+    moves = []
+    while True:
+        ended = get_game_result(board)
+        if ended:
+            result, termination = ended
+            break
+
+        # without a depth the search is limited by time or nodes, or else uses the default depth
+        config = configs[board.turn]
+        depth = config.get('depth', MAX_DEPTH if 'movetime' in config or 'nodes' in config else 3)
+        move = engines[board.turn].search(
+            depth, config.get('movetime'), None, config.get('nodes'))
+        moves.append(board.get_san(move))
+        board.make_move(move)
+
+    return {
+        'game': number,
+        'fen': fen,
+        'moves': moves,
+        'result': result,
+        'termination': termination
+    }
+
+
+def format_pgn(game: dict, white: str, black: str) -> str:
+    """Writes a played game as pgn.
+
+    Args:
+        game (dict): the game given by play_game
+        white (str): name of the white player
+        black (str): name of the black player
+
+    Returns:
+        str: pgn text of the game
+    """
+    headers = {
+        'Event': 'PyChess self-play',
+        'Site': '?',
+        'Date': date.today().strftime('%Y.%m.%d'),
+        'Round': str(game['game']),
+        'White': white,
+        'Black': black,
+        'Result': game['result'],
+        'SetUp': '1',
+        'FEN': game['fen'],
+        'PlyCount': str(len(game['moves'])),
+        'Termination': game['termination']
+    }
+    return pgn.format_pgn(headers, game['moves'], game['result'])
+
+
+def summarize(games: List[dict]) -> dict:
+    """Gives the score of the first engine and the elo difference it corresponds to.
+
+    Args:
+        games (List[dict]): the played games with the color of the first engine
+
+    Returns:
+        dict: wins, draws and losses of the first engine, its score and the elo difference
+    """
+    wins = draws = losses = 0
+    for game in games:
+        if game['result'] == RESULTS[2]:
+            draws += 1
+        elif RESULTS.index(game['result']) == game['engine1_color']:
+            wins += 1
+        else:
+            losses += 1
+
+    total = wins + draws + losses
+    score = (wins + draws / 2) / total if total else 0.0
+    if 0 < score < 1:
+        elo = round(-400 * math.log10(1 / score - 1), 1)
+    else:
+        elo = None
+
+    return {'games': total, 'wins': wins, 'draws': draws, 'losses': losses, 'score': round(score, 4), 'elo': elo}
+
+
+def run_match(engine1: dict, engine2: dict, games: int, openings: List[str] = None, processes: int = None, pgn_output=None) -> dict:
+    """Plays a match between two engine configurations. Every opening is played with both colors, games run concurrently and are written to the pgn output as soon as they finish.
+
+    Args:
+        engine1 (dict): configuration of the first engine
+        engine2 (dict): configuration of the second engine
+        games (int): number of games
+        openings (List[str], optional): fen strings of the starting positions. Defaults to the starting position.
+        processes (int, optional): number of processes, None uses all cpus. Defaults to None.
+        pgn_output (optional): file the games are written to as pgn. Defaults to None.
+
+    Returns:
+        dict: all games and the summary from the perspective of the first engine
+    """
+    openings = openings or [START_FEN]
+    names = [f'engine1 {engine1}', f'engine2 {engine2}']
+
+    tasks = []
+    for number in range(games):
+        fen = openings[(number // 2) % len(openings)]
+        if number % 2 == 0:
+            tasks.append((number + 1, fen, engine1, engine2))
+        else:
+            tasks.append((number + 1, fen, engine2, engine1))
+
+    played = []
+    with Pool(processes) as pool:
+        for game in pool.imap_unordered(play_game, tasks):
+            game['engine1_color'] = (game['game'] - 1) % 2
+            played.append(game)
+            if pgn_output:
+                white, black = names if game['engine1_color'] == 0 else names[::-1]
+                pgn_output.write(format_pgn(game, white, black) + '\n')
+                pgn_output.flush()
+
+    played.sort(key=lambda game: game['game'])
+    return {'games': played, 'summary': summarize(played)}
+
+
+def main(argv: List[str] = None) -> dict:
+    """Command line entry point of the match runner, run with python -m Game.match.
+
+    Args:
+        argv (List[str], optional): command line arguments. Defaults to the arguments of the process.
+
+    Returns:
+        dict: the games and summary
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m Game.match', description='Plays games between two engine configurations and reports the score and elo difference.')
+    parser.add_argument('--engine1', default='depth=3',
+                        help='configuration of the first engine, e.g. depth=3,hash=16 or movetime=0.5')
+    parser.add_argument('--engine2', default='depth=2',
+                        help='configuration of the second engine')
+    parser.add_argument('--games', type=int, default=10,
+                        help='number of games, every opening is played with both colors')
+    parser.add_argument('--openings', help='file with one opening fen or epd per line')
+    parser.add_argument('--pgn', help='file the games are written to')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='number of processes, 0 uses all cpus')
+    args = parser.parse_args(argv)
+
+    openings = None
+    if args.openings:
+        with open(args.openings) as file:
+            openings = [fen for _, fen, _ in read_epd(file)]
+
+    pgn_output = open(args.pgn, 'w') if args.pgn else None
+    try:
+        result = run_match(parse_config(args.engine1), parse_config(args.engine2),
+                           args.games, openings, args.processes or None, pgn_output)
+    finally:
+        if pgn_output:
+            pgn_output.close()
+
+    summary = result['summary']
+    print(
+        f'engine1 vs engine2: +{summary["wins"]} ={summary["draws"]} -{summary["losses"]} ({summary["games"]} games)')
+    print(f'Score: {round(100 * summary["score"], 1)}%')
+    print(f'Elo difference: {summary["elo"] if summary["elo"] is not None else "-"}')
+
+    return result
+
+
+if __name__ == '__main__':
+    main()
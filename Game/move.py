@@ -44,6 +44,16 @@ class Move:
             100 + self.target_rank * 10 + self.target_file
         self.move_id_notation = f'{pos_to_not(self.start_rank, self.start_file)}{pos_to_not(self.target_rank, self.target_file)}'
 
+    def get_notation(self) -> str:
+        """Gives the move in long algebraic notation, the start and end square followed by the piece promoted to in case of a promotion.
+
+        Returns:
+            str: long algebraic notation of the move, e.g. e2e4 or e7e8q
+        """
+        if self.is_promotion:
+            return self.move_id_notation + PIECE_NAME[self.promotion_choice]
+        return self.move_id_notation
+
     def __str__(self) -> str:
         """Returns the string representation of the object in the form of the start square and end square in chess notation.
 
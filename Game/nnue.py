@@ -0,0 +1,221 @@
+import os
+import mmap
+import struct
+import argparse
+from typing import List, Tuple
+
+import numpy as np
+
+from .settings import *
+from .board import Board
+from .move import Move
+from .evaluator import Evaluator
+
+# A network file starts with a header followed by little endian float32 weights: the (INPUTS, hidden) first
+# layer, its hidden biases, the 2 * hidden output weights and the output bias. The first layer is summed into an
+# accumulator for both players, the output layer gets the clipped accumulator of the player to move followed by
+# that of the other player and gives the evaluation in pawns.
+_HEADER = struct.Struct('<4sII')  # magic, version, hidden size
+_MAGIC = b'PCNN'
+_VERSION = 1
+INPUTS = 768  # a feature for every color, piece type and square
+
+
+def get_feature(color: int, type: int, rank: int, file: int, perspective: int) -> int:
+    """Gives the input of a piece as seen by a player, the board is mirrored for black so both players see their own pieces as the first 6 types.
+
+    Args:
+        color (int): color of the piece
+        type (int): type of the piece
+        rank (int): rank of the piece
+        file (int): file of the piece
+        perspective (int): color of the player
+
+    Returns:
+        int: index of the input
+    """
+    if perspective == 1:
+        color, rank = 1 - color, 7 - rank
+    return (color * 6 + type) * 64 + rank * 8 + file
+
+
+def write_weights(path: str, w1: np.ndarray, b1: np.ndarray, w2: np.ndarray, b2: float) -> None:
+    """Writes the weights of a network to a file.
+
+    Args:
+        path (str): path of the file
+        w1 (np.ndarray): (INPUTS, hidden) weights of the first layer
+        b1 (np.ndarray): (hidden,) biases of the first layer
+        w2 (np.ndarray): (2 * hidden,) weights of the output layer
+        b2 (float): bias of the output layer
+    """
+    hidden = len(b1)
+    if w1.shape != (INPUTS, hidden) or w2.shape != (2 * hidden,):
+        raise ValueError('the layers of the network do not fit together')
+    with open(path, 'wb') as file:
+        file.write(_HEADER.pack(_MAGIC, _VERSION, hidden))
+        for weights in (w1, b1, w2, np.array([b2])):
+            np.asarray(weights, dtype='<f4').tofile(file)
+
+
+def material_weights(hidden: int = NNUE_HIDDEN) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """Gives the weights of a network that counts material with PIECE_VALUE, a starting point for training and a check of the network evaluator. The first two accumulator values hold the material of the player and of the opponent, the others are unused.
+
+    Args:
+        hidden (int, optional): size of the accumulator, at least 2. Defaults to NNUE_HIDDEN.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, float]: the weights and biases of the layers
+    """
+    # the material is scaled down so it stays below the clipping of the accumulator
+    scale = 128
+    w1 = np.zeros((INPUTS, hidden), dtype=np.float32)
+    for color in range(2):
+        for type in range(1, 6):
+            for square in range(64):
+                w1[(color * 6 + type) * 64 + square, color] = PIECE_VALUE[type] / scale
+    w2 = np.zeros(2 * hidden, dtype=np.float32)
+    w2[0], w2[1] = scale, -scale
+    return w1, np.zeros(hidden, dtype=np.float32), w2, 0.0
+
+
+class NNUEEvaluator(Evaluator):
+    def __init__(self, path: str = NNUE_FILE) -> None:
+        """Loads a network evaluator. The weights file is memory mapped, the first layer is only read for the pieces on the board and the pieces that move.
+
+        Args:
+            path (str, optional): path of the weights file. Defaults to NNUE_FILE.
+        """
+        super().__init__()
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            header = self._file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f'{path} is not a network file of version {_VERSION}')
+            magic, version, hidden = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f'{path} is not a network file of version {_VERSION}')
+            size = INPUTS * hidden
+            if os.fstat(self._file.fileno()).st_size != _HEADER.size + 4 * (size + 3 * hidden + 1):
+                raise ValueError(f'{path} does not contain a network with {hidden} hidden values')
+        except ValueError:
+            self._file.close()
+            raise
+
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        weights = np.frombuffer(self._map, dtype='<f4', offset=_HEADER.size)
+        self.hidden = hidden
+        self.w1 = weights[:size].reshape(INPUTS, hidden)
+        self.b1 = weights[size:size + hidden]
+        self.w2 = weights[size + hidden:size + 3 * hidden]
+        self.b2 = float(weights[size + 3 * hidden])
+
+        # the accumulators of both players after every move, unmaking a move drops the last one
+        self.accumulators: List[np.ndarray] = []
+
+    def close(self) -> None:
+        """Detaches the evaluator and closes the weights file.
+        """
+        super().close()
+        self.w1 = self.b1 = self.w2 = None
+        self._map.close()
+        self._file.close()
+
+    def _get_rows(self, pieces: List[Tuple[int, int, int, int]]) -> np.ndarray:
+        """Gives the summed first layer weights of pieces for both players.
+
+        Args:
+            pieces (List[Tuple[int, int, int, int]]): the color, type, rank and file of every piece
+
+        Returns:
+            np.ndarray: (2, hidden) summed weights
+        """
+        indices = [[get_feature(*piece, perspective) for piece in pieces] for perspective in (0, 1)]
+        return self.w1[indices].sum(axis=1)
+
+    def refresh(self) -> np.ndarray:
+        """Computes the accumulators of the current position from scratch.
+
+        Returns:
+            np.ndarray: (2, hidden) accumulators of white and black
+        """
+        pieces = [(piece.color, piece.type, piece.rank, piece.file)
+                  for color in self.board.pieces for pieces in color for piece in pieces]
+        return self.b1 + self._get_rows(pieces)
+
+    def reset(self) -> None:
+        """Computes the accumulators of the position the board was set up in.
+        """
+        self.accumulators = [self.refresh()]
+
+    def make_move(self, move: Move) -> None:
+        """Updates the accumulators with the first layer weights of the pieces that moved, were captured or were promoted.
+
+        Args:
+            move (Move): the move that was made
+        """
+        color = move.piece.color
+        removed = [(color, 5 if move.is_promotion else move.piece.type, move.start_rank, move.start_file)]
+        added = [(color, move.piece.type, move.target_rank, move.target_file)]
+        if move.captured:
+            removed.append((move.captured.color, move.captured.type,
+                            move.captured.rank, move.captured.file))
+        if move.is_castle:
+            rook_file = 7 if move.start_file < move.target_file else 0
+            removed.append((color, 2, move.start_rank, rook_file))
+            added.append((color, 2, move.start_rank, move.castled_rook.file))
+
+        self.accumulators.append(
+            self.accumulators[-1] + self._get_rows(added) - self._get_rows(removed))
+
+    def unmake_move(self, move: Move) -> None:
+        """Restores the accumulators from before the move.
+
+        Args:
+            move (Move): the move that was unmade
+        """
+        self.accumulators.pop()
+
+    def evaluate(self) -> float:
+        """Evaluates the current position with the output layer.
+
+        Returns:
+            float: the evaluation in pawns from the perspective of the player to move
+        """
+        accumulator = self.accumulators[-1]
+        turn = self.board.turn
+        inputs = np.clip(np.concatenate((accumulator[turn], accumulator[1 - turn])), 0, 1)
+        return float(inputs @ self.w2) + self.b2
+
+
+def main(argv: List[str] = None) -> None:
+    """Command line entry point of the network evaluator, run with python -m Game.nnue.
+
+    Args:
+        argv (List[str], optional): command line arguments. Defaults to the arguments of the process.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m Game.nnue', description='Writes a network that counts material or evaluates a position with a network.')
+    parser.add_argument('--file', default=NNUE_FILE, help='path of the network')
+    parser.add_argument('--material', action='store_true',
+                        help='writes a network that counts material with the piece values')
+    parser.add_argument('--hidden', type=int, default=NNUE_HIDDEN,
+                        help='size of the accumulator of the written network')
+    parser.add_argument('--probe', metavar='FEN', help='evaluates a position with the network')
+    args = parser.parse_args(argv)
+
+    if args.material:
+        write_weights(args.file, *material_weights(args.hidden))
+        print(f'material network with {args.hidden} hidden values written to {args.file}')
+    elif args.probe:
+        evaluator = NNUEEvaluator(args.file)
+        evaluator.attach(Board(args.probe))
+        print(round(evaluator.evaluate(), 4))
+        evaluator.close()
+    else:
+        parser.error('give --material or --probe')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+import os
+import argparse
+import json
+import sys
+from time import time
+from typing import List, Tuple
+from multiprocessing import Pool
+
+from .settings import *
+from .board import Board
+from .engine import Engine
+
+SUITE_FILE = os.path.join(ROOT_DIR, 'perft_suite.epd')
+
+
+def run_perft(fen: str, depth: int, divide: bool = False, fast: bool = False, hash_size: int = 0) -> dict:
+    """Runs the perft test on the position given by the fen string and measures the move generation speed.
+
+    Args:
+        fen (str): the position to count the nodes of
+        depth (int): search depth
+        divide (bool, optional): wether to also count the nodes per root move. Defaults to False.
+        fast (bool, optional): wether to bulk count the last ply with Engine.fast_perft. Defaults to False.
+        hash_size (int, optional): number of entries in the fast perft cache, 0 disables it. Defaults to 0.
+
+    Returns:
+        dict: the fen, depth, total nodes, elapsed time in seconds, nodes per second and the node count per root move when dividing
+    """
+    engine = Engine(Board(fen))
+
+    t0 = time()
+    if divide:
+        moves_per_move = engine.perft_divide(depth, fast, hash_size)
+        nodes = sum(moves_per_move.values())
+    elif fast:
+        moves_per_move = None
+        nodes = engine.fast_perft(depth, hash_size)
+    else:
+        moves_per_move = None
+        nodes = engine.perft(depth)
+    t1 = time()
+
+    elapsed = t1 - t0
+    return {
+        'fen': fen,
+        'depth': depth,
+        'nodes': nodes,
+        'time': round(elapsed, 3),
+        'nps': round(nodes / elapsed) if elapsed > 0 else 0,
+        'divide': moves_per_move
+    }
+
+
+def _get_paths(board: Board, split_depth: int) -> List[List[str]]:
+    """Generates all move sequences of the given length from the current position, these are the subtrees divided over the processes.
+
+    Args:
+        board (Board): board in the position to split
+        split_depth (int): number of moves in every sequence
+
+    Returns:
+        List[List[str]]: list of move sequences in move notation
+    """
+    if split_depth == 0:
+        return [[]]
+
+    paths = []
+    for move in board.get_legal_moves():
+        board.make_move(move)
+        for path in _get_paths(board, split_depth - 1):
+            paths.append([move.get_notation()] + path)
+        board.unmake_move()
+    return paths
+
+
+def _count_path(task: Tuple[str, List[str], int, bool, int]) -> Tuple[List[str], int]:
+    """Worker function that replays a move sequence on a new board and counts the positions of the subtree below it.
+
+    Args:
+        task (Tuple[str, List[str], int, bool, int]): the fen, move sequence, remaining depth, fast and hash size
+
+    Returns:
+        Tuple[List[str], int]: the move sequence and the number of positions below it
+    """
+    fen, path, depth, fast, hash_size = task
+    board = Board(fen)
+    for notation in path:
+        for move in board.get_legal_moves():
+            if move.get_notation() == notation:
+                board.make_move(move)
+                break
+
+    engine = Engine(board)
+    if fast:
+        return path, engine.fast_perft(depth, hash_size)
+    return path, engine.perft(depth)
+
+
+def parallel_perft(fen: str, depth: int, processes: int = None, fast: bool = True, hash_size: int = 0, split_depth: int = 1, pool: Pool = None) -> dict:
+    """Runs the perft test with the subtrees of the root (or of the first two plies) divided over a pool of processes.
+
+    Args:
+        fen (str): the position to count the nodes of
+        depth (int): search depth
+        processes (int, optional): number of processes, defaults to the number of cpus. Defaults to None.
+        fast (bool, optional): wether the processes use Engine.fast_perft. Defaults to True.
+        hash_size (int, optional): cache size of every process when using fast perft. Defaults to 0.
+        split_depth (int, optional): number of plies the tree is split at, 1 or 2. Defaults to 1.
+        pool (Pool, optional): existing process pool to use instead of creating one. Defaults to None.
+
+    Returns:
+        dict: the same result as run_perft with the node count per root move
+    """
+    t0 = time()
+    split_depth = max(0, min(split_depth, depth - 1))
+    paths = _get_paths(Board(fen), split_depth)
+    tasks = [(fen, path, depth - split_depth, fast, hash_size)
+             for path in paths]
+
+    moves_per_move = {}
+    if pool is None:
+        with Pool(processes) as new_pool:
+            counts = new_pool.map(_count_path, tasks, chunksize=1)
+    else:
+        counts = pool.map(_count_path, tasks, chunksize=1)
+    for path, nodes in counts:
+        if path:
+            moves_per_move[path[0]] = moves_per_move.get(path[0], 0) + nodes
+    t1 = time()
+
+    nodes = sum(count for _, count in counts)
+    elapsed = t1 - t0
+    return {
+        'fen': fen,
+        'depth': depth,
+        'nodes': nodes,
+        'time': round(elapsed, 3),
+        'nps': round(nodes / elapsed) if elapsed > 0 else 0,
+        'divide': moves_per_move
+    }
+
+
+def read_suite(path: str) -> List[Tuple[str, dict]]:
+    """Reads a perft suite file. Every line contains a fen followed by the expected node counts, e.g. "<fen> ;D1 20 ;D2 400".
+
+    Args:
+        path (str): path of the suite file
+
+    Returns:
+        List[Tuple[str, dict]]: list of fen strings with their expected node count per depth
+    """
+    suite = []
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split(';')
+            fen = fields[0].strip()
+            if len(fen.split(' ')) == 4:
+                fen += ' 0 1'
+            expected = {}
+            for field in fields[1:]:
+                depth, nodes = field.split()
+                expected[int(depth.lstrip('D'))] = int(nodes)
+            suite.append((fen, expected))
+    return suite
+
+
+def run_suite(path: str, max_depth: int, processes: int = None, fast: bool = True, hash_size: int = 0, split_depth: int = 1) -> dict:
+    """Runs the parallel perft test on every position of a suite file and compares the node counts to the expected values. Depths are tested from low to high and the run stops at the first mismatch.
+
+    Args:
+        path (str): path of the suite file
+        max_depth (int): the highest depth to test
+        processes (int, optional): number of processes, defaults to the number of cpus. Defaults to None.
+        fast (bool, optional): wether the processes use Engine.fast_perft. Defaults to True.
+        hash_size (int, optional): cache size of every process when using fast perft. Defaults to 0.
+        split_depth (int, optional): number of plies the tree is split at, 1 or 2. Defaults to 1.
+
+    Returns:
+        dict: wether all tests passed, the results of all tests and the failing result in case of a mismatch
+    """
+    results = []
+    with Pool(processes) as pool:
+        for fen, expected in read_suite(path):
+            for depth in sorted(expected):
+                if depth > max_depth:
+                    break
+                result = parallel_perft(
+                    fen, depth, processes, fast, hash_size, split_depth, pool)
+                result['expected'] = expected[depth]
+                results.append(result)
+                if result['nodes'] != expected[depth]:
+                    return {'passed': False, 'results': results, 'failed': result}
+
+    return {'passed': True, 'results': results, 'failed': None}
+
+
+def format_result(result: dict) -> str:
+    """Formats a perft result in the same layout as the perft functions of the engine used to print.
+
+    Args:
+        result (dict): result given by run_perft
+
+    Returns:
+        str: readable text of the result
+    """
+    lines = []
+    if result['divide'] is not None:
+        for key in result['divide']:
+            lines.append(f'{key}: {result["divide"][key]}')
+        lines.append('')
+    lines.append(f'Nodes searched: {result["nodes"]}')
+    lines.append(f'Time: {result["time"]}s')
+    lines.append(f'Nodes/second: {result["nps"]}')
+    return '\n'.join(lines)
+
+
+def main(argv: List[str] = None) -> dict:
+    """Command line entry point for the perft test, run with python -m Game.perft.
+
+    Args:
+        argv (List[str], optional): command line arguments. Defaults to the arguments of the process.
+
+    Returns:
+        dict: the perft result
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m Game.perft', description='Counts the leaf nodes of the legal move tree of a position.')
+    parser.add_argument('--fen', default=START_FEN,
+                        help='position to test, defaults to the starting position')
+    parser.add_argument('--depth', type=int, default=3, help='search depth')
+    parser.add_argument('--divide', action='store_true',
+                        help='also print the node count per root move')
+    parser.add_argument('--fast', action='store_true',
+                        help='count the legal moves at the last ply instead of making them')
+    parser.add_argument('--hash', type=int, default=0,
+                        help='number of positions cached by the fast perft, implies --fast')
+    parser.add_argument('--json', action='store_true',
+                        help='print the result as a single json line')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='divide the root moves over this many processes, 0 uses all cpus')
+    parser.add_argument('--split', type=int, default=1,
+                        help='number of plies the tree is split at when running in parallel')
+    parser.add_argument('--suite', nargs='?', const=SUITE_FILE,
+                        help=f'run every position of a suite file up to --depth and stop at the first mismatch, defaults to {SUITE_FILE}')
+    args = parser.parse_args(argv)
+
+    fast = args.fast or args.hash > 0
+    processes = args.processes or None
+
+    if args.suite:
+        suite_result = run_suite(args.suite, args.depth, processes,
+                                 fast, args.hash, args.split)
+        for result in suite_result['results']:
+            status = 'ok' if result['nodes'] == result['expected'] else 'FAILED'
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(
+                    f'{status}: depth {result["depth"]} nodes {result["nodes"]} expected {result["expected"]} time {result["time"]}s nps {result["nps"]} {result["fen"]}')
+        if not suite_result['passed'] and not args.json:
+            print(format_result(suite_result['failed']))
+        if not suite_result['passed']:
+            sys.exit(1)
+        return suite_result
+
+    if args.processes != 1:
+        result = parallel_perft(args.fen, args.depth, processes,
+                                fast, args.hash, args.split)
+    else:
+        result = run_perft(args.fen, args.depth, args.divide,
+                           fast, args.hash)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(format_result(result))
+
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import re
+from typing import List, Iterator
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+_HEADER = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+_TOKEN = re.compile(r'\{|\}|\(|\)|;|\$\d+|[^\s{}();]+')
+_MOVE_NUMBER = re.compile(r'^\d+\.*')
+
+
+def read_pgn(file) -> Iterator[dict]:
+    """Lazily reads the games of a pgn file. Only the game being read is kept in memory, so files with any number of games can be replayed. Comments, variations and numeric annotations are skipped.
+
+    Args:
+        file: an open text file
+
+    Yields:
+        Iterator[dict]: the headers, moves in standard algebraic notation and result of every game
+    """
+    headers = {}
+    moves = []
+    comment = False
+    variation = 0
+
+    for line in file:
+        if not comment and not variation:
+            # escaped lines are ignored
+            if line.startswith('%'):
+                continue
+
+            header = _HEADER.match(line.strip())
+            if header:
+                # a game without a result ends at the headers of the next game
+                if moves:
+                    yield {'headers': headers, 'moves': moves, 'result': headers.get('Result', '*')}
+                    headers, moves = {}, []
+                headers[header.group(1)] = header.group(2).replace('\\"', '"')
+                continue
+
+        for token in _TOKEN.findall(line):
+            if comment:
+                if token == '}':
+                    comment = False
+            elif token == '{':
+                comment = True
+            elif token == ';':
+                break
+            elif token == '(':
+                variation += 1
+            elif token == ')':
+                variation = max(0, variation - 1)
+            elif variation or token.startswith('$'):
+                continue
+            elif token in RESULTS:
+                yield {'headers': headers, 'moves': moves, 'result': token}
+                headers, moves = {}, []
+            else:
+                token = _MOVE_NUMBER.sub('', token)
+                if token:
+                    moves.append(token)
+
+    if headers or moves:
+        yield {'headers': headers, 'moves': moves, 'result': headers.get('Result', '*')}
+
+
+def format_pgn(headers: dict, moves: List[str], result: str = '*') -> str:
+    """Writes a game as pgn, the move numbers start from the FEN header if there is one.
+
+    Args:
+        headers (dict): the headers of the game in the order they should be written
+        moves (List[str]): the moves in standard algebraic notation
+        result (str, optional): the result of the game. Defaults to '*'.
+
+    Returns:
+        str: pgn text of the game
+    """
+    headers = dict(headers)
+    headers['Result'] = result
+    lines = []
+    for key, value in headers.items():
+        value = str(value).replace('"', '\\"')
+        lines.append(f'[{key} "{value}"]')
+
+    fen = headers.get('FEN', '').split(' ')
+    board_turn = 1 if len(fen) > 1 and fen[1] == 'b' else 0
+    fullturn = int(fen[5]) if len(fen) > 5 else 1
+
+    tokens = []
+    for i, move in enumerate(moves):
+        if (i + board_turn) % 2 == 0:
+            tokens.append(f'{fullturn}.')
+        elif i == 0:
+            tokens.append(f'{fullturn}...')
+        tokens.append(move)
+        if (i + board_turn) % 2 == 1:
+            fullturn += 1
+    tokens.append(result)
+
+    # movetext lines are at most 80 characters long
+    movetext = []
+    line = ''
+    for token in tokens:
+        if line and len(line) + len(token) + 1 > 80:
+            movetext.append(line)
+            line = token
+        else:
+            line = f'{line} {token}' if line else token
+    movetext.append(line)
+
+    return '\n'.join(lines) + '\n\n' + '\n'.join(movetext) + '\n'
@@ -1,14 +1,19 @@
-import pygame
 import os
+import json
+import random
+
+# pygame prints a banner when it is imported, which would end up in the output of the command line tools
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame
 
 # This file is to store all the constant values in the chess program
 
 # window settings
 SCREEN_SIZE = 600
-UI_WIDTH = 0  # BOARD_SIZE//2
-WIN = pygame.display.set_mode((SCREEN_SIZE + UI_WIDTH, SCREEN_SIZE))
-pygame.display.set_caption('PyChess')
-FPS = 60
+UI_WIDTH = SCREEN_SIZE//2  # width of the search info panel next to the board
+EVENT_TIMEOUT = 1000  # ms the main loop sleeps while waiting for an event
+ENGINE_MOVE = pygame.USEREVENT + 1  # posted by the engine thread when it found a move
+INFO_INTERVAL = 0.25  # s between updates of the search info, so drawing it does not slow the search down
 
 # game settings
 SQUARE_SIZE = SCREEN_SIZE//8
@@ -25,31 +30,35 @@ DARK_RED = (153, 0, 0, 200)
 BG = (192, 192, 192, 200)
 BG_DARK = (128, 128, 128)
 
+# files that belong to the program are found from the project directory, so the tools can be run from anywhere
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_DIR = os.path.join(ROOT_DIR, 'Assets')
+
 # images
 white_king = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'king_w.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'king_w.png')), (PIECE_SIZE, PIECE_SIZE))
 black_king = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'king_b.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'king_b.png')), (PIECE_SIZE, PIECE_SIZE))
 white_queen = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'queen_w.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'queen_w.png')), (PIECE_SIZE, PIECE_SIZE))
 black_queen = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'queen_b.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'queen_b.png')), (PIECE_SIZE, PIECE_SIZE))
 white_pawn = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'pawn_w.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'pawn_w.png')), (PIECE_SIZE, PIECE_SIZE))
 black_pawn = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'pawn_b.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'pawn_b.png')), (PIECE_SIZE, PIECE_SIZE))
 white_horse = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'knight_w.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'knight_w.png')), (PIECE_SIZE, PIECE_SIZE))
 black_horse = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'knight_b.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'knight_b.png')), (PIECE_SIZE, PIECE_SIZE))
 white_bishop = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'bishop_w.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'bishop_w.png')), (PIECE_SIZE, PIECE_SIZE))
 black_bishop = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'bishop_b.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'bishop_b.png')), (PIECE_SIZE, PIECE_SIZE))
 white_rook = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'rook_w.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'rook_w.png')), (PIECE_SIZE, PIECE_SIZE))
 black_rook = pygame.transform.scale(pygame.image.load(
-    os.path.join('Assets', 'rook_b.png')), (PIECE_SIZE, PIECE_SIZE))
+    os.path.join(ASSETS_DIR, 'rook_b.png')), (PIECE_SIZE, PIECE_SIZE))
 
 IMGS = [
     [white_king, black_king],
@@ -61,6 +70,7 @@ IMGS = [
 ]
 
 # other
+PROMOTION_SQUARES = {(3, 3): 1, (3, 4): 2, (4, 3): 3, (4, 4): 4}  # squares of the promotion dialog and the piece they choose
 BOARD_NOTATION = [
     [col+str(row) for col in ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']] for row in range(8, 0, -1)
 ]
@@ -71,3 +81,136 @@ PIECE_NAME_FULL = ['king', 'queen', 'rook', 'bishop', 'knight', 'pawn']
 PIECE_COLORS = ['w', 'b']
 PIECE_COLORS_FULL = ['white', 'black']
 PIECE_VALUE = [999999, 9, 5, 3, 3, 1]
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# move tables, precomputed for every square and indexed by [rank][file]
+DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0),
+              (1, 1), (1, -1), (-1, 1), (-1, -1))
+KNIGHT_OFFSETS = ((-1, -2), (-1, 2), (1, -2), (1, 2),
+                  (-2, -1), (-2, 1), (2, -1), (2, 1))
+
+# squares along each of the 8 directions, the first 4 are straight and the last 4 are diagonal
+RAYS = [
+    [[[(rank + d[0]*i, file + d[1]*i) for i in range(1, 8)
+       if 0 <= rank + d[0]*i < 8 and 0 <= file + d[1]*i < 8] for d in DIRECTIONS] for file in range(8)] for rank in range(8)
+]
+KNIGHT_ATTACKS = [
+    [[(rank + d[0], file + d[1]) for d in KNIGHT_OFFSETS
+      if 0 <= rank + d[0] < 8 and 0 <= file + d[1] < 8] for file in range(8)] for rank in range(8)
+]
+KING_ATTACKS = [
+    [[(rank + d[0], file + d[1]) for d in DIRECTIONS
+      if 0 <= rank + d[0] < 8 and 0 <= file + d[1] < 8] for file in range(8)] for rank in range(8)
+]
+# squares attacked by a pawn, indexed by [color][rank][file]
+PAWN_ATTACKS = [
+    [[[(rank + direction, file + d) for d in (-1, 1)
+       if 0 <= rank + direction < 8 and 0 <= file + d < 8] for file in range(8)] for rank in range(8)]
+    for direction in (-1, 1)
+]
+
+# zobrist keys, random 64 bit numbers xored together to give every position a key
+_zobrist_random = random.Random(2021)
+ZOBRIST_PIECES = [
+    [[[_zobrist_random.getrandbits(64) for _ in range(8)] for _ in range(8)] for _ in range(6)] for _ in range(2)
+]  # indexed by [color][type][rank][file]
+ZOBRIST_CASTLE = [[_zobrist_random.getrandbits(64) for _ in range(2)]
+                  for _ in range(2)]  # indexed by [color][king side, queen side]
+ZOBRIST_EN_PASSANT = [_zobrist_random.getrandbits(64) for _ in range(8)]
+ZOBRIST_TURN = _zobrist_random.getrandbits(64)
+
+# evaluation, the heatmaps give a bonus for the placement of a piece from white's side and are indexed by [rank][file]
+KNIGHT_HEATMAP = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [-1, 0, 0, 0, 0, 0, 0, -1],
+    [-1, 0, 1, 1, 1, 1, 0, -1],
+    [-1, 0, 1, 2, 2, 1, 0, -1],
+    [-1, 0, 1, 2, 2, 1, 0, -1],
+    [-1, 0, 1, 1, 1, 1, 0, -1],
+    [-1, 0, 0, 1, 1, 0, 0, -1],
+    [-1, -1, -1, -1, -1, -1, -1, -1]
+]
+BISHOP_HEATMAP = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 1, 1, 0, 0, 0],
+    [0, 0, 1, 2, 2, 1, 0, 0],
+    [0, 1, 2, 1, 1, 2, 1, 0],
+    [0, 2, 1, 0, 0, 1, 2, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0]
+]
+KING_HEATMAP = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [1, 0, 0, 0, 0, 0, 0, 1],
+    [2, 2, 2, 0, 0, 0, 2, 2]
+]
+PAWN_HEATMAP = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 1, 2, 2, 1, 0, 0],
+    [0, 0, 1, 2, 2, 1, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0]
+]
+# heatmaps of both colors indexed by [color][rank][file], black's are mirrored except the pawn heatmap which is symmetric
+KNIGHT_HEATMAPS = [KNIGHT_HEATMAP, KNIGHT_HEATMAP[::-1]]
+BISHOP_HEATMAPS = [BISHOP_HEATMAP, BISHOP_HEATMAP[::-1]]
+KING_HEATMAPS = [KING_HEATMAP, KING_HEATMAP[::-1]]
+PAWN_HEATMAPS = [PAWN_HEATMAP, PAWN_HEATMAP]
+# weights of the placement scores in the evaluation
+KNIGHT_WEIGHT = 0.1
+BISHOP_WEIGHT = 0.2
+KING_WEIGHT = 0.4
+PAWN_WEIGHT = 0.3
+BATCH_CHUNK = 16384  # positions the batch evaluator scores at once, limits the memory of its intermediate arrays
+
+# tuned evaluation parameters written by python -m Game.tune replace the hand picked values above
+EVAL_PARAMS_FILE = os.path.join(ROOT_DIR, 'eval_params.json')
+EVAL_PARAMS = ('PIECE_VALUE', 'KNIGHT_WEIGHT', 'BISHOP_WEIGHT', 'KING_WEIGHT', 'PAWN_WEIGHT')
+if os.path.exists(EVAL_PARAMS_FILE):
+    with open(EVAL_PARAMS_FILE) as _file:
+        globals().update({name: value for name, value in json.load(_file).items() if name in EVAL_PARAMS})
+TUNE_CHUNK = 250000  # positions the tuner reads and processes at once, bounds its memory use
+TUNE_SKIP_PLIES = 8  # opening plies of every pgn game that are not used for tuning
+NNUE_FILE = 'nnue.bin'  # weights of the network evaluator
+NNUE_HIDDEN = 32  # size of the accumulator of a new network
+
+# search
+MATE_SCORE = 999999  # score of being checkmated, mates further away score closer to 0 by one per ply
+MATE_BOUND = MATE_SCORE - 1000  # scores beyond this are mate scores
+MAX_DEPTH = 64
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2  # kind of value stored in the transposition table
+TT_ENTRY_SIZE = 200  # approximate memory of one transposition table entry in bytes
+PAWN_TABLE_SIZE = 16384  # number of pawn structures whose pawn score is cached by the engine
+
+# clock and time management
+CLOCK_BASE = 300  # s every player starts with in the game window, 0 plays without clocks at a fixed depth
+CLOCK_INCREMENT = 3  # s added after every move
+TM_MOVES_TO_GO = 40  # moves expected to be left at the start of the game
+TM_MIN_MOVES_TO_GO = 20  # moves always expected to be left, however long the game is
+TM_INCREMENT_FRACTION = 0.75  # part of the increment used for every move
+TM_HARD_FACTOR = 4  # the hard limit is this many times the soft limit
+TM_MAX_FRACTION = 0.5  # part of the remaining time a single move may use at most
+TM_MARGIN = 0.05  # s kept back for the overhead of making a move
+TM_MIN_TIME = 0.01  # s every move may use, even when the time is almost up
+TM_STABLE_DEPTHS = 3  # number of depths the best move has to stay the same to stop early
+TM_STABLE_FRACTION = 0.5  # part of the soft limit after which a stable best move stops the search
+
+# opening book
+BOOK_FILE = 'book.bin'
+BOOK_ENTRY_SIZE = 16  # bytes of one record: 64 bit key, 16 bit move, 16 bit weight and 32 bits unused
+BOOK_PLY = 20  # number of plies of every game added to the book
+BOOK_CHUNK = 1000000  # positions counted in memory before they are written to a temporary sorted run
+
+# endgame tablebases
+TB_DIR = 'tablebases'
+TB_PIECES = 4  # positions with at most this many pieces, kings included, are probed
+TB_ILLEGAL = 255  # value of the positions that can not occur in a game
@@ -0,0 +1,148 @@
+import json
+from time import perf_counter
+from typing import List
+
+
+class SearchStats:
+    def __init__(self) -> None:
+        """Initializes an empty statistics object, one is made for every search when statistics are enabled on the engine.
+        """
+        self.nodes = 0
+        self.qnodes = 0
+        self.time = 0.0
+
+        # per completed depth
+        self.depth_times: List[float] = []
+        self.depth_nodes: List[int] = []
+
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.pawn_probes = 0
+        self.pawn_hits = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tb_hits = 0
+
+        # time spent in the board and evaluation functions
+        self.movegen_time = 0.0
+        self.eval_time = 0.0
+        self.make_unmake_time = 0.0
+
+        self._instrumented = []
+
+    def get_nps(self) -> int:
+        """Gives the number of nodes searched per second.
+
+        Returns:
+            int: nodes per second
+        """
+        return round(self.nodes / self.time) if self.time > 0 else 0
+
+    def get_branching_factors(self) -> List[float]:
+        """Gives the effective branching factor of every completed depth, the number of nodes of a depth divided by those of the previous depth.
+
+        Returns:
+            List[float]: branching factor from the second completed depth on
+        """
+        return [round(self.depth_nodes[i] / self.depth_nodes[i - 1], 2)
+                for i in range(1, len(self.depth_nodes)) if self.depth_nodes[i - 1]]
+
+    def get_tt_hit_rate(self) -> float:
+        """Gives the fraction of transposition table probes that found an entry.
+
+        Returns:
+            float: hit rate between 0 and 1
+        """
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def get_pawn_hit_rate(self) -> float:
+        """Gives the fraction of pawn table probes that found the score of the pawn structure.
+
+        Returns:
+            float: hit rate between 0 and 1
+        """
+        return self.pawn_hits / self.pawn_probes if self.pawn_probes else 0.0
+
+    def get_first_move_cutoff_rate(self) -> float:
+        """Gives the fraction of beta cutoffs caused by the first move searched, a measure of the move ordering quality.
+
+        Returns:
+            float: cutoff rate between 0 and 1
+        """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def to_dict(self) -> dict:
+        """Converts the statistics to a dictionary.
+
+        Returns:
+            dict: all statistics including the derived rates
+        """
+        return {
+            'nodes': self.nodes,
+            'qnodes': self.qnodes,
+            'time': round(self.time, 4),
+            'nps': self.get_nps(),
+            'depth_times': [round(t, 4) for t in self.depth_times],
+            'depth_nodes': self.depth_nodes,
+            'branching_factors': self.get_branching_factors(),
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_hit_rate': round(self.get_tt_hit_rate(), 4),
+            'pawn_probes': self.pawn_probes,
+            'pawn_hits': self.pawn_hits,
+            'pawn_hit_rate': round(self.get_pawn_hit_rate(), 4),
+            'cutoffs': self.cutoffs,
+            'tb_hits': self.tb_hits,
+            'first_move_cutoff_rate': round(self.get_first_move_cutoff_rate(), 4),
+            'movegen_time': round(self.movegen_time, 4),
+            'eval_time': round(self.eval_time, 4),
+            'make_unmake_time': round(self.make_unmake_time, 4)
+        }
+
+    def emit(self, output) -> None:
+        """Writes the statistics as a single json line.
+
+        Args:
+            output: file the line is written to
+        """
+        output.write(json.dumps(self.to_dict()) + '\n')
+        output.flush()
+
+    def instrument(self, engine) -> None:
+        """Replaces the move generation, make/unmake and evaluation functions used by the engine with timed versions. The originals are restored by release, so there is no timing overhead when statistics are disabled.
+
+        Args:
+            engine (Engine): the engine that is about to search
+        """
+        self._wrap(engine.board, 'get_legal_moves', 'movegen_time')
+        self._wrap(engine.board, 'make_move', 'make_unmake_time')
+        self._wrap(engine.board, 'unmake_move', 'make_unmake_time')
+        self._wrap(engine, 'evaluate', 'eval_time')
+
+    def release(self) -> None:
+        """Restores the functions replaced by instrument.
+        """
+        for obj, name in self._instrumented:
+            del obj.__dict__[name]
+        self._instrumented = []
+
+    def _wrap(self, obj, name: str, counter: str) -> None:
+        """Replaces a method of an object with a version that adds its run time to one of the time counters.
+
+        Args:
+            obj: the object whose method is replaced
+            name (str): name of the method
+            counter (str): name of the time counter
+        """
+        function = getattr(obj, name)
+        stats = self
+
+        def timed(*args, **kwargs):
+            t0 = perf_counter()
+            result = function(*args, **kwargs)
+            setattr(stats, counter, getattr(stats, counter) +
+                    perf_counter() - t0)
+            return result
+
+        obj.__dict__[name] = timed
+        self._instrumented.append((obj, name))
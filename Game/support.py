@@ -42,3 +42,34 @@ def get_row_col_from_mouse(pos: Tuple[float, float]) -> Tuple[int, int]:
     row = y // SQUARE_SIZE
     col = x // SQUARE_SIZE
     return row, col
+
+
+def get_mate_distance(score: float) -> int:
+    """Converts a search score to the number of moves until mate.
+
+    Args:
+        score (float): search score from the perspective of the player to move
+
+    Returns:
+        int: moves until mate, negative when the player to move gets mated, None if the score is not a mate score
+    """
+    if score >= MATE_BOUND:
+        return int(MATE_SCORE - score + 1) // 2
+    if score <= -MATE_BOUND:
+        return -(int(MATE_SCORE + score) // 2)
+    return None
+
+
+def format_evaluation(score: float) -> str:
+    """Converts a search score to a short text, mate scores are given as the number of moves until mate.
+
+    Args:
+        score (float): search score
+
+    Returns:
+        str: the score in pawns, e.g. +0.35, or the moves until mate, e.g. M3 or -M2
+    """
+    mate = get_mate_distance(score)
+    if mate is not None:
+        return f'M{mate}' if mate > 0 else f'-M{-mate}'
+    return f'{score:+.2f}'
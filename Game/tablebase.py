@@ -0,0 +1,596 @@
+import os
+import mmap
+import argparse
+from time import time
+from itertools import product, combinations_with_replacement
+from collections import defaultdict
+from typing import List, Tuple
+
+from .settings import *
+from .board import Board
+
+# The tables store one byte per position: 0 for a draw, TB_ILLEGAL for positions that can not occur
+# and otherwise the number of plies to mate plus one. An odd number of plies to mate is a win for
+# the side to move and an even number a loss. Castling and en passant are not part of the tables.
+
+# move tables indexed by square = rank * 8 + file
+_KING = [frozenset(r * 8 + f for r, f in KING_ATTACKS[s // 8][s % 8]) for s in range(64)]
+_KNIGHT = [frozenset(r * 8 + f for r, f in KNIGHT_ATTACKS[s // 8][s % 8]) for s in range(64)]
+_PAWN_ATTACKS = [[frozenset(r * 8 + f for r, f in PAWN_ATTACKS[color][s // 8][s % 8])
+                  for s in range(64)] for color in range(2)]
+_RAYS = [[[r * 8 + f for r, f in ray] for ray in RAYS[s // 8][s % 8]] for s in range(64)]
+_SLIDER_DIRECTIONS = [None, range(8), range(4), range(4, 8)]  # by piece type, queen, rook and bishop
+_TABLE_VALUE = [0, 9, 5, 3, 3, 1]  # piece values that decide which side is white in a table, fixed so tuned values do not rename tables
+
+# direction and squares in between for every pair of squares on a line
+_LINES = [[None] * 64 for _ in range(64)]
+for _start in range(64):
+    for _direction, _ray in enumerate(_RAYS[_start]):
+        for _i, _target in enumerate(_ray):
+            _LINES[_start][_target] = (_direction, _ray[:_i])
+
+# the 8 symmetries of the board: mirroring the files, the ranks and along the diagonal
+_TRANSFORMS = []
+for _t in range(8):
+    _squares = []
+    for _square in range(64):
+        _rank, _file = divmod(_square, 8)
+        if _t & 1:
+            _file = 7 - _file
+        if _t & 2:
+            _rank = 7 - _rank
+        if _t & 4:
+            _rank, _file = _file, _rank
+        _squares.append(_rank * 8 + _file)
+    _TRANSFORMS.append(_squares)
+
+
+def _attacks(type: int, color: int, start: int, target: int, occupied: set) -> bool:
+    """Checks if a piece attacks a square.
+
+    Args:
+        type (int): type of the piece
+        color (int): color of the piece
+        start (int): square of the piece
+        target (int): the attacked square
+        occupied (set): the occupied squares
+
+    Returns:
+        bool: wether the piece attacks the square
+    """
+    if type == 0:
+        return target in _KING[start]
+    if type == 4:
+        return target in _KNIGHT[start]
+    if type == 5:
+        return target in _PAWN_ATTACKS[color][start]
+    line = _LINES[start][target]
+    return line is not None and line[0] in _SLIDER_DIRECTIONS[type] and not any(square in occupied for square in line[1])
+
+
+def _strength(types: List[int]) -> tuple:
+    """Gives a sortable strength of the pieces of one side, the side with more and more valuable pieces is white in the tables.
+
+    Args:
+        types (List[int]): types of the pieces other than the king
+
+    Returns:
+        tuple: the strength
+    """
+    return (len(types), sorted((_TABLE_VALUE[type] for type in types), reverse=True), [-type for type in sorted(types)])
+
+
+def get_material_name(types: List[List[int]]) -> str:
+    """Gives the name of a table, like KQvKR, with the pieces of both sides other than the kings.
+
+    Args:
+        types (List[List[int]]): the types of the white and of the black pieces other than the kings
+
+    Returns:
+        str: name of the table
+    """
+    return 'v'.join('K' + ''.join(PIECE_NAME[type].upper() for type in sorted(side)) for side in types)
+
+
+def _parse_name(name: str) -> List[Tuple[int, int]]:
+    """Gives the pieces of a table in the order of the index: the white king, the black king, the other white pieces and the other black pieces.
+
+    Args:
+        name (str): name of the table, like KQvKR
+
+    Returns:
+        List[Tuple[int, int]]: color and type of every piece
+    """
+    sides = name.split('v')
+    pieces = [(0, 0), (1, 0)]
+    for color, side in enumerate(sides):
+        for char in side[1:]:
+            pieces.append((color, PIECE_NAME.index(char.lower())))
+    return pieces
+
+
+def normalize(entries: List[Tuple[int, int, int]], turn: int) -> Tuple[str, List[int], int]:
+    """Converts a position to the table that contains it. The stronger side is white in the tables, so the colors may be swapped and the board flipped.
+
+    Args:
+        entries (List[Tuple[int, int, int]]): color, type and square of every piece
+        turn (int): the side to move
+
+    Returns:
+        Tuple[str, List[int], int]: name of the table, squares in the order of the table and the side to move in the table
+    """
+    types = [[], []]
+    for color, type, _ in entries:
+        if type != 0:
+            types[color].append(type)
+
+    if _strength(types[1]) > _strength(types[0]):
+        entries = [(1 - color, type, square ^ 56) for color, type, square in entries]
+        types = types[::-1]
+        turn = 1 - turn
+
+    entries = sorted(entries, key=lambda entry: (entry[1] != 0, entry[0], entry[1]))
+    return get_material_name(types), [square for _, _, square in entries], turn
+
+
+class Tablebase:
+    def __init__(self, name: str, data=None) -> None:
+        """Initializes the table of a material combination.
+
+        Args:
+            name (str): name of the table, like KQvKR
+            data (optional): the values of the positions, a memory map or bytearray. Defaults to None.
+        """
+        self.name = name
+        self.pieces = _parse_name(name)
+        self.data = data
+
+        # the white king is moved to the a1-d1-d4 triangle, or to the a-d files when there are pawns
+        pawns = any(type == 5 for _, type in self.pieces)
+        if pawns:
+            transforms = (0, 1)
+            self.king_squares = [s for s in range(64) if s % 8 <= 3]
+        else:
+            transforms = range(8)
+            self.king_squares = [s for s in range(64)
+                                 if s % 8 <= 3 and s // 8 >= 4 and 7 - s // 8 <= s % 8]
+        self._king_slot = {square: i for i, square in enumerate(self.king_squares)}
+        self._king_transforms = [[t for t in transforms if _TRANSFORMS[t][square] in self._king_slot]
+                                 for square in range(64)]
+
+        # pieces of the same color and type are sorted by square, so every position has one index
+        self._groups = []
+        start = 2
+        for end in range(3, len(self.pieces) + 1):
+            if end == len(self.pieces) or self.pieces[end] != self.pieces[start]:
+                if end - start > 1:
+                    self._groups.append((start, end))
+                start = end
+
+        self.size = 2 * len(self.king_squares) * 64 ** (len(self.pieces) - 1)
+
+    def index(self, turn: int, squares: List[int]) -> int:
+        """Gives the index of a position. Of the symmetric positions the one with the lowest squares is used.
+
+        Args:
+            turn (int): the side to move
+            squares (List[int]): square of every piece in the order of the table
+
+        Returns:
+            int: index of the position
+        """
+        best = None
+        for t in self._king_transforms[squares[0]]:
+            transform = _TRANSFORMS[t]
+            mapped = [transform[square] for square in squares]
+            for start, end in self._groups:
+                mapped[start:end] = sorted(mapped[start:end])
+            if best is None or mapped < best:
+                best = mapped
+
+        index = turn * len(self.king_squares) + self._king_slot[best[0]]
+        for square in best[1:]:
+            index = index * 64 + square
+        return index
+
+    def decode(self, index: int) -> Tuple[int, List[int]]:
+        """Gives the position of an index.
+
+        Args:
+            index (int): index of the position
+
+        Returns:
+            Tuple[int, List[int]]: the side to move and square of every piece
+        """
+        squares = []
+        for _ in range(len(self.pieces) - 1):
+            index, square = divmod(index, 64)
+            squares.append(square)
+        turn, slot = divmod(index, len(self.king_squares))
+        squares.append(self.king_squares[slot])
+        return turn, squares[::-1]
+
+    def get(self, turn: int, squares: List[int]) -> int:
+        """Gives the value of a position.
+
+        Args:
+            turn (int): the side to move
+            squares (List[int]): square of every piece in the order of the table
+
+        Returns:
+            int: 0 for a draw, TB_ILLEGAL or the number of plies to mate plus one
+        """
+        return self.data[self.index(turn, squares)]
+
+    def in_check(self, color: int, squares: List[int], occupied: set, captured: int = None) -> bool:
+        """Checks if the king of a color is attacked.
+
+        Args:
+            color (int): color of the king
+            squares (List[int]): square of every piece
+            occupied (set): the occupied squares
+            captured (int, optional): index of a captured piece that does not attack. Defaults to None.
+
+        Returns:
+            bool: wether the king is attacked
+        """
+        king = squares[color]
+        for i, (piece_color, type) in enumerate(self.pieces):
+            if piece_color != color and i != captured and _attacks(type, piece_color, squares[i], king, occupied):
+                return True
+        return False
+
+    def get_moves(self, turn: int, squares: List[int]):
+        """Generates the legal moves of a position.
+
+        Args:
+            turn (int): the side to move
+            squares (List[int]): square of every piece
+
+        Yields:
+            the index of the moved piece, its new squares, the index of the captured piece or None and the piece promoted to or None
+        """
+        occupied = set(squares)
+        for i, (color, type) in enumerate(self.pieces):
+            if color != turn:
+                continue
+            start = squares[i]
+
+            if type == 5:
+                forward = start - 8 if color == 0 else start + 8
+                promotion = forward // 8 in (0, 7)
+                targets = []
+                if forward not in occupied:
+                    targets.append(forward)
+                    double = start - 16 if color == 0 else start + 16
+                    if start // 8 == (6 if color == 0 else 1) and double not in occupied:
+                        targets.append(double)
+                targets.extend(target for target in _PAWN_ATTACKS[color][start] if target in occupied)
+            elif type == 0:
+                targets = _KING[start]
+                promotion = False
+            elif type == 4:
+                targets = _KNIGHT[start]
+                promotion = False
+            else:
+                targets = []
+                for direction in _SLIDER_DIRECTIONS[type]:
+                    for target in _RAYS[start][direction]:
+                        targets.append(target)
+                        if target in occupied:
+                            break
+                promotion = False
+
+            for target in targets:
+                captured = None
+                if target in occupied:
+                    captured = squares.index(target)
+                    if self.pieces[captured][0] == turn:
+                        continue
+
+                new_squares = list(squares)
+                new_squares[i] = target
+                new_occupied = occupied - {start}
+                new_occupied.add(target)
+                if self.in_check(turn, new_squares, new_occupied, captured):
+                    continue
+
+                if promotion:
+                    for choice in range(1, 5):
+                        yield i, new_squares, captured, choice
+                else:
+                    yield i, new_squares, captured, None
+
+    def get_predecessors(self, turn: int, squares: List[int]) -> set:
+        """Gives the positions from which the side that is not to move can reach a position without capturing or promoting.
+
+        Args:
+            turn (int): the side to move
+            squares (List[int]): square of every piece
+
+        Returns:
+            set: indices of the previous positions
+        """
+        mover = 1 - turn
+        occupied = set(squares)
+        predecessors = set()
+        for i, (color, type) in enumerate(self.pieces):
+            if color != mover:
+                continue
+            current = squares[i]
+
+            if type == 5:
+                origins = []
+                back = current + 8 if color == 0 else current - 8
+                if back not in occupied and 1 <= back // 8 <= 6:
+                    origins.append(back)
+                    double = current + 16 if color == 0 else current - 16
+                    if current // 8 == (4 if color == 0 else 3) and double not in occupied:
+                        origins.append(double)
+            elif type == 0:
+                origins = [origin for origin in _KING[current] if origin not in occupied]
+            elif type == 4:
+                origins = [origin for origin in _KNIGHT[current] if origin not in occupied]
+            else:
+                origins = []
+                for direction in _SLIDER_DIRECTIONS[type]:
+                    for origin in _RAYS[current][direction]:
+                        if origin in occupied:
+                            break
+                        origins.append(origin)
+
+            for origin in origins:
+                previous = list(squares)
+                previous[i] = origin
+                predecessors.add(self.index(mover, previous))
+        return predecessors
+
+
+class Tablebases:
+    def __init__(self, directory: str = TB_DIR) -> None:
+        """Gives access to the tables in a directory, they are memory mapped when first used.
+
+        Args:
+            directory (str, optional): directory of the tables. Defaults to TB_DIR.
+        """
+        self.directory = directory
+        self.tables = {}
+
+    def get_path(self, name: str) -> str:
+        """Gives the path of a table.
+
+        Args:
+            name (str): name of the table
+
+        Returns:
+            str: path of the table file
+        """
+        return os.path.join(self.directory, f'{name}.tb')
+
+    def get_table(self, name: str) -> Tablebase:
+        """Gives a table, loading it when it is first used.
+
+        Args:
+            name (str): name of the table
+
+        Returns:
+            Tablebase: the table, None if its file does not exist
+        """
+        if name not in self.tables:
+            table = None
+            path = self.get_path(name)
+            if os.path.exists(path):
+                with open(path, 'rb') as file:
+                    table = Tablebase(name, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+            self.tables[name] = table
+        return self.tables[name]
+
+    def get_value(self, entries: List[Tuple[int, int, int]], turn: int) -> int:
+        """Gives the value of a position in its table.
+
+        Args:
+            entries (List[Tuple[int, int, int]]): color, type and square of every piece
+            turn (int): the side to move
+
+        Returns:
+            int: the value, None if the table is not available
+        """
+        if len(entries) == 2:
+            return 0
+        name, squares, turn = normalize(entries, turn)
+        table = self.get_table(name)
+        if table is None:
+            return None
+        return table.get(turn, squares)
+
+    def probe(self, board: Board) -> Tuple[int, int]:
+        """Looks up the position of a board.
+
+        Args:
+            board (Board): the board
+
+        Returns:
+            Tuple[int, int]: 1 for a win, 0 for a draw or -1 for a loss of the side to move and the number of plies to mate, None if the position is not in the tables
+        """
+        if board.piece_count > TB_PIECES or board.en_passant_target_square or any(board.castle[0]) or any(board.castle[1]):
+            return None
+
+        entries = []
+        for color in range(2):
+            for type, pieces in enumerate(board.pieces[color]):
+                for piece in pieces:
+                    entries.append((color, type, piece.rank * 8 + piece.file))
+
+        value = self.get_value(entries, board.turn)
+        if value is None or value == TB_ILLEGAL:
+            return None
+        if value == 0:
+            return 0, 0
+        plies = value - 1
+        return (1 if plies % 2 else -1), plies
+
+    def generate(self, name: str, verbose: bool = False) -> Tablebase:
+        """Generates a table by retrograde analysis and writes it to the directory. The tables reached by captures and promotions are generated first when they do not exist yet.
+
+        Starting from the checkmates, every position that can move to a lost position is won one ply later, and a position is lost when all of its moves lead to won positions.
+        Counters of the moves that have not been shown to lose yet are kept per position, so every position is visited a bounded number of times.
+
+        Args:
+            name (str): name of the table, like KQvKR
+            verbose (bool, optional): wether to print the progress. Defaults to False.
+
+        Returns:
+            Tablebase: the generated table
+        """
+        table = Tablebase(name)
+        pieces = table.pieces
+        t0 = time()
+
+        data = bytearray(table.size)
+        counts = bytearray(table.size)  # moves that have not been shown to lead to a won position
+        conversion_losses = bytearray(table.size)  # longest loss by capturing or promoting
+        buckets = defaultdict(list)  # positions resolved at a number of plies to mate
+
+        # the value of every move that captures or promotes is taken from a smaller table
+        def convert(i, new_squares, captured, choice, turn):
+            entries = [(color, choice if j == i and choice else type, new_squares[j])
+                       for j, (color, type) in enumerate(pieces) if j != captured]
+            value = self.get_value(entries, 1 - turn)
+            if value is None:
+                self.generate(normalize(entries, 1 - turn)[0], verbose)
+                value = self.get_value(entries, 1 - turn)
+            return value
+
+        index = 0
+        for turn in range(2):
+            for king_square in table.king_squares:
+                for rest in product(range(64), repeat=len(pieces) - 1):
+                    squares = [king_square, *rest]
+                    if (len(set(squares)) < len(squares) or
+                            any(type == 5 and squares[i] // 8 in (0, 7) for i, (_, type) in enumerate(pieces)) or
+                            table.index(turn, squares) != index or
+                            table.in_check(1 - turn, squares, set(squares))):
+                        data[index] = TB_ILLEGAL
+                        index += 1
+                        continue
+
+                    children = set()
+                    moves = 0
+                    win = 0
+                    loss = 0
+                    escape = False
+                    for i, new_squares, captured, choice in table.get_moves(turn, squares):
+                        moves += 1
+                        if captured is None and choice is None:
+                            children.add(table.index(1 - turn, new_squares))
+                            continue
+                        value = convert(i, new_squares, captured, choice, turn)
+                        if value == 0:
+                            escape = True
+                        elif value % 2:
+                            win = min(win, value) if win else value
+                        else:
+                            loss = max(loss, value)
+
+                    if not moves:
+                        if table.in_check(turn, squares, set(squares)):
+                            buckets[0].append(index)
+                    else:
+                        if win:
+                            buckets[win].append(index)
+                        counts[index] = len(children) + (1 if win or escape else 0)
+                        conversion_losses[index] = loss
+                        if not counts[index]:
+                            buckets[loss].append(index)
+                    index += 1
+
+        plies = 0
+        while buckets:
+            for index in buckets.pop(plies, []):
+                if data[index]:
+                    continue
+                data[index] = plies + 1
+                turn, squares = table.decode(index)
+                for previous in table.get_predecessors(turn, squares):
+                    if data[previous]:
+                        continue
+                    if plies % 2 == 0:
+                        buckets[plies + 1].append(previous)
+                    else:
+                        counts[previous] -= 1
+                        if not counts[previous]:
+                            buckets[max(plies + 1, conversion_losses[previous])].append(previous)
+            plies += 1
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.get_path(name), 'wb') as file:
+            file.write(data)
+        table.data = data
+        self.tables[name] = table
+
+        if verbose:
+            print(f'{name}: {table.size} positions, longest mate {plies - 1} plies, {round(time() - t0, 1)}s')
+        return table
+
+
+def get_material_names(pieces: int) -> List[str]:
+    """Gives the names of all tables with a number of pieces, the stronger side is white.
+
+    Args:
+        pieces (int): number of pieces including the kings
+
+    Returns:
+        List[str]: names of the tables
+    """
+    names = set()
+    for white in range(pieces - 1):
+        black = pieces - 2 - white
+        for white_types in combinations_with_replacement(range(1, 6), white):
+            for black_types in combinations_with_replacement(range(1, 6), black):
+                types = [list(white_types), list(black_types)]
+                if _strength(types[1]) > _strength(types[0]):
+                    types = types[::-1]
+                names.add(get_material_name(types))
+    return sorted(names, key=lambda name: (len(name), name))
+
+
+def main(argv: List[str] = None) -> None:
+    """Command line entry point of the tablebase generator, run with python -m Game.tablebase.
+
+    Args:
+        argv (List[str], optional): command line arguments. Defaults to the arguments of the process.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m Game.tablebase', description='Generates endgame tablebases by retrograde analysis or probes a position.')
+    parser.add_argument('tables', nargs='*', help='names of the tables, like KQvK or KRvKB')
+    parser.add_argument('--pieces', type=int, choices=(3, 4),
+                        help='generates all tables up to this number of pieces')
+    parser.add_argument('--dir', default=TB_DIR, help='directory of the tables')
+    parser.add_argument('--probe', metavar='FEN', help='shows the value of a position')
+    args = parser.parse_args(argv)
+
+    tablebases = Tablebases(args.dir)
+    if args.probe:
+        result = tablebases.probe(Board(args.probe))
+        if result is None:
+            print('not in the tables')
+        elif result[0] == 0:
+            print('draw')
+        else:
+            print(f'{"win" if result[0] > 0 else "loss"} for the side to move, mate in {result[1]} plies')
+        return
+
+    names = list(args.tables)
+    if args.pieces:
+        for pieces in range(3, args.pieces + 1):
+            names.extend(get_material_names(pieces))
+    if not names:
+        parser.error('give table names, --pieces or --probe')
+
+    for name in names:
+        if tablebases.get_table(name) is None:
+            tablebases.generate(name, verbose=True)
+
+
+if __name__ == '__main__':
+    main()
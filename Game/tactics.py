@@ -0,0 +1,208 @@
+import json
+import argparse
+from time import time
+from multiprocessing import Pool
+from typing import List, Tuple
+
+from .settings import *
+from .board import Board
+from .engine import Engine
+from .move import Move
+from .epd import read_epd
+
+TACTICS_HASH = 16  # MB of transposition table per position
+
+
+def matches(board: Board, move: Move, notations: List[str]) -> bool:
+    """Checks if a move is one of the moves given in an epd operation, written in standard algebraic notation or as start and end square like Move.move_id_notation, optionally with the promotion piece.
+
+    Args:
+        board (Board): the board in the position of the move
+        move (Move): the move to check
+        notations (List[str]): the operands of a bm or am operation
+
+    Returns:
+        bool: wether the move is in the list
+    """
+    if move.move_id_notation in notations or move.get_notation() in notations:
+        return True
+    san = board.get_san(move).rstrip('+#')
+    return any(notation.rstrip('+#!?') == san for notation in notations)
+
+
+def is_solution(board: Board, move: Move, operations: dict) -> bool:
+    """Checks if a move solves a test position, it has to be one of the best moves (bm) and none of the avoid moves (am).
+
+    Args:
+        board (Board): the board in the test position
+        move (Move): the move found by the engine
+        operations (dict): the epd operations of the position
+
+    Returns:
+        bool: wether the move solves the position
+    """
+    if move is None:
+        return False
+    if 'bm' in operations and not matches(board, move, operations['bm']):
+        return False
+    if 'am' in operations and matches(board, move, operations['am']):
+        return False
+    return True
+
+
+def solve_position(task: Tuple[int, str, dict, float, int]) -> dict:
+    """Searches a test position and records when the engine settled on a solution. The time and nodes to solution are those of the first completed depth from which on every depth gave a solving move, or those of the whole search when the solution was only found in the interrupted last depth.
+
+    Args:
+        task (Tuple[int, str, dict, float, int]): the line number, fen, epd operations, time limit and node limit
+
+    Returns:
+        dict: the move found, wether it solves the position and the time and nodes to solution
+    """
+    number, fen, operations, time_limit, node_limit = task
+    board = Board(fen)
+    engine = Engine(board, hash_size=TACTICS_HASH)
+    solution = {'time': None, 'nodes': None}
+
+    def progress(info: dict) -> None:
+        if info['pv'] and is_solution(board, info['pv'][0], operations):
+            if solution['time'] is None:
+                solution['time'] = info['time']
+                solution['nodes'] = info['nodes']
+        else:
+            solution['time'] = None
+            solution['nodes'] = None
+
+    t0 = time()
+    best_move = engine.search(MAX_DEPTH, time_limit, progress, node_limit)
+    solved = is_solution(board, best_move, operations)
+    # the solving move can come from the last depth, which was interrupted before it was reported
+    if solved and solution['time'] is None:
+        solution['time'] = time() - t0
+        solution['nodes'] = engine.nodes
+
+    return {
+        'line': number,
+        'id': ' '.join(operations.get('id', [])),
+        'fen': fen,
+        'move': best_move.get_notation() if best_move else None,
+        'solved': solved,
+        'time_to_solution': round(solution['time'], 3) if solved else None,
+        'nodes_to_solution': solution['nodes'] if solved else None,
+        'nodes': engine.nodes
+    }
+
+
+def run_tactics(path: str, time_limit: float = None, node_limit: int = None, processes: int = None) -> dict:
+    """Runs every position of an epd suite with bm or am operations and summarizes the solve rate.
+
+    Args:
+        path (str): path of the epd file
+        time_limit (float, optional): search time per position in seconds. Defaults to None.
+        node_limit (int, optional): search nodes per position. Defaults to None.
+        processes (int, optional): number of processes, None uses all cpus. Defaults to None.
+
+    Returns:
+        dict: the result per position and the summary
+    """
+    with open(path) as file:
+        tasks = [(number, fen, operations, time_limit, node_limit)
+                 for number, fen, operations in read_epd(file)
+                 if 'bm' in operations or 'am' in operations]
+
+    if processes == 1:
+        results = [solve_position(task) for task in tasks]
+    else:
+        with Pool(processes) as pool:
+            results = pool.map(solve_position, tasks, chunksize=1)
+
+    return {'results': results, 'summary': summarize(results, time_limit)}
+
+
+def summarize(results: List[dict], time_limit: float = None) -> dict:
+    """Summarizes the results of a test suite.
+
+    Args:
+        results (List[dict]): the result of every position given by solve_position
+        time_limit (float, optional): the time limit per position, used to give the solve rate at fractions of it. Defaults to None.
+
+    Returns:
+        dict: number of positions and solutions, solve rate, average time and nodes to solution and the solve rate over time
+    """
+    solved = [result for result in results if result['solved']]
+    times = [result['time_to_solution']
+             for result in solved if result['time_to_solution'] is not None]
+    nodes = [result['nodes_to_solution']
+             for result in solved if result['nodes_to_solution'] is not None]
+
+    summary = {
+        'positions': len(results),
+        'solved': len(solved),
+        'solve_rate': round(len(solved) / len(results), 4) if results else 0.0,
+        'average_time_to_solution': round(sum(times) / len(times), 3) if times else None,
+        'average_nodes_to_solution': round(sum(nodes) / len(nodes)) if nodes else None
+    }
+
+    # share of the positions solved within a fraction of the time limit
+    if time_limit and results:
+        summary['solve_rate_over_time'] = {
+            f'{round(fraction * time_limit, 3)}s': round(sum(1 for t in times if t <= fraction * time_limit) / len(results), 4)
+            for fraction in (0.1, 0.25, 0.5, 1.0)
+        }
+
+    return summary
+
+
+def main(argv: List[str] = None) -> dict:
+    """Command line entry point of the test suite runner, run with python -m Game.tactics.
+
+    Args:
+        argv (List[str], optional): command line arguments. Defaults to the arguments of the process.
+
+    Returns:
+        dict: the results and summary
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m Game.tactics', description='Runs an epd test suite with bm/am operations and reports the solve rate.')
+    parser.add_argument('suite', help='epd file')
+    parser.add_argument('--movetime', type=float, default=None,
+                        help='search time per position in seconds')
+    parser.add_argument('--nodes', type=int, default=None,
+                        help='search nodes per position')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='number of processes, 0 uses all cpus')
+    parser.add_argument('--json', action='store_true',
+                        help='print every result and the summary as json lines')
+    args = parser.parse_args(argv)
+
+    time_limit = args.movetime
+    if time_limit is None and args.nodes is None:
+        time_limit = 1.0
+
+    result = run_tactics(args.suite, time_limit, args.nodes,
+                         args.processes or None)
+
+    if args.json:
+        for position in result['results']:
+            print(json.dumps(position))
+        print(json.dumps(result['summary']))
+    else:
+        for position in result['results']:
+            status = 'ok' if position['solved'] else 'FAILED'
+            print(
+                f'{status:<6} {position["move"] or "-":<6} {position["id"] or position["fen"]}')
+        summary = result['summary']
+        print(
+            f'\nSolved {summary["solved"]}/{summary["positions"]} ({round(100 * summary["solve_rate"], 1)}%)')
+        print(
+            f'Average time to solution: {summary["average_time_to_solution"]}s')
+        print(
+            f'Average nodes to solution: {summary["average_nodes_to_solution"]}')
+        for limit, rate in summary.get('solve_rate_over_time', {}).items():
+            print(f'Solved within {limit}: {round(100 * rate, 1)}%')
+
+    return result
+
+
+if __name__ == '__main__':
+    main()
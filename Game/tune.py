@@ -0,0 +1,332 @@
+import os
+import re
+import json
+import math
+import argparse
+import tempfile
+from itertools import islice
+from typing import List, Tuple, Iterator, Iterable
+
+import numpy as np
+
+from .settings import *
+from .board import Board
+from .epd import parse_epd
+from .pgn import read_pgn
+from .batch import FEATURES, pack_fens, get_features
+
+# the features of every position are written once to a file that is memory mapped by every pass of the tuner
+_RECORD = np.dtype([('features', np.int16, FEATURES), ('result', np.float32)])
+_LABELS = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5,
+           '1': 1.0, '1.0': 1.0, '0.5': 0.5, '0': 0.0, '0.0': 0.0}
+_BRACKET = re.compile(r'\[([^\]]*)\]\s*$')
+_LN10 = math.log(10)
+
+PARAM_NAMES = ['queen', 'rook', 'bishop', 'knight', 'pawn',
+               'knight placement', 'bishop placement', 'king placement', 'pawn placement']
+
+
+def parse_labeled(line: str) -> Tuple[str, float]:
+    """Parses a labeled position, a fen or epd followed by the result of its game in brackets like "[1.0]" or "[1-0]", or an epd with a c9 operation like c9 "1-0";.
+
+    Args:
+        line (str): the line
+
+    Returns:
+        Tuple[str, float]: the fen and the result from white's perspective, None if the line has no result
+    """
+    bracket = _BRACKET.search(line)
+    if bracket:
+        line = line[:bracket.start()]
+    fen, operations = parse_epd(line)
+    label = bracket.group(1).strip() if bracket else operations.get('c9', [None])[0]
+    if label not in _LABELS:
+        return None
+    return fen, _LABELS[label]
+
+
+def read_labeled(paths: List[str], skip_plies: int = TUNE_SKIP_PLIES) -> Iterator[Tuple[str, float]]:
+    """Lazily reads labeled positions from files of labeled fen or epd lines and from pgn files, where every position after the opening is labeled with the result of its game.
+
+    Args:
+        paths (List[str]): paths of the files, files ending with .pgn are read as pgn
+        skip_plies (int, optional): opening plies of every pgn game that are not used. Defaults to TUNE_SKIP_PLIES.
+
+    Yields:
+        Iterator[Tuple[str, float]]: the fen and result from white's perspective of every position
+    """
+    for path in paths:
+        with open(path) as file:
+            if path.endswith('.pgn'):
+                yield from _read_pgn_positions(file, skip_plies)
+                continue
+            for line in file:
+                if not line.strip() or line.lstrip().startswith('#'):
+                    continue
+                position = parse_labeled(line)
+                if position:
+                    yield position
+
+
+def _read_pgn_positions(file, skip_plies: int) -> Iterator[Tuple[str, float]]:
+    """Replays the games of a pgn file and gives their positions, games without a result are skipped.
+
+    Args:
+        file: an open pgn file
+        skip_plies (int): opening plies of every game that are not used
+
+    Yields:
+        Iterator[Tuple[str, float]]: the fen and result from white's perspective of every position
+    """
+    board = Board(START_FEN)
+    for game in read_pgn(file):
+        result = _LABELS.get(game['result'])
+        if result is None:
+            continue
+        board.fen = game['headers'].get('FEN', START_FEN)
+        board.reset()
+        try:
+            for ply, san in enumerate(game['moves'], 1):
+                board.make_move(board.parse_san(san))
+                if ply > skip_plies:
+                    yield board.get_fen(), result
+        except ValueError:
+            # the positions before the illegal move are kept
+            continue
+
+
+def extract_features(positions: Iterable[Tuple[str, float]], output, chunk: int = TUNE_CHUNK) -> int:
+    """Writes the features and results of labeled positions to a file, a chunk of positions at a time.
+
+    Args:
+        positions (Iterable[Tuple[str, float]]): the fen and result of every position
+        output: binary file the records are written to
+        chunk (int, optional): number of positions processed at once. Defaults to TUNE_CHUNK.
+
+    Returns:
+        int: number of positions written
+    """
+    positions = iter(positions)
+    count = 0
+    while True:
+        batch = list(islice(positions, chunk))
+        if not batch:
+            return count
+        squares, _ = pack_fens(fen for fen, _ in batch)
+        records = np.empty(len(batch), dtype=_RECORD)
+        records['features'] = get_features(squares)
+        records['result'] = [result for _, result in batch]
+        records.tofile(output)
+        count += len(batch)
+
+
+def get_params() -> np.ndarray:
+    """Gives the current evaluation parameters, the piece values without the king and the weights of the placement scores.
+
+    Returns:
+        np.ndarray: the parameters in the order of PARAM_NAMES
+    """
+    return np.array(list(PIECE_VALUE[1:]) + [KNIGHT_WEIGHT, BISHOP_WEIGHT, KING_WEIGHT, PAWN_WEIGHT], dtype=np.float64)
+
+
+def save_params(params: np.ndarray, path: str = EVAL_PARAMS_FILE) -> dict:
+    """Writes evaluation parameters to the file that is loaded by the settings.
+
+    Args:
+        params (np.ndarray): the parameters in the order of PARAM_NAMES
+        path (str, optional): path of the file. Defaults to EVAL_PARAMS_FILE.
+
+    Returns:
+        dict: the written parameters by their setting name
+    """
+    params = [round(float(value), 4) for value in params]
+    values = {
+        'PIECE_VALUE': [PIECE_VALUE[0]] + params[:5],
+        'KNIGHT_WEIGHT': params[5],
+        'BISHOP_WEIGHT': params[6],
+        'KING_WEIGHT': params[7],
+        'PAWN_WEIGHT': params[8]
+    }
+    with open(path, 'w') as file:
+        json.dump(values, file, indent=4)
+    return values
+
+
+def _chunks(data: np.ndarray, chunk: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Gives the features, without the king count, and the results of the records a chunk at a time.
+
+    Args:
+        data (np.ndarray): the memory mapped records
+        chunk (int): number of records at once
+
+    Yields:
+        Iterator[Tuple[np.ndarray, np.ndarray]]: the (n, 9) float features and (n,) results
+    """
+    for start in range(0, len(data), chunk):
+        records = data[start:start + chunk]
+        yield records['features'][:, 1:].astype(np.float64), records['result'].astype(np.float64)
+
+
+def sigmoid(evaluation: np.ndarray, k: float) -> np.ndarray:
+    """Converts evaluations from white's perspective to the expected result for white.
+
+    Args:
+        evaluation (np.ndarray): evaluations in pawns
+        k (float): scaling constant
+
+    Returns:
+        np.ndarray: expected results between 0 and 1
+    """
+    return 1 / (1 + np.power(10.0, -k * evaluation / 4))
+
+
+def compute_error(data: np.ndarray, params: np.ndarray, k: float, chunk: int = TUNE_CHUNK) -> float:
+    """Gives the mean squared error between the results and the expected results of the evaluations.
+
+    Args:
+        data (np.ndarray): the memory mapped records
+        params (np.ndarray): the evaluation parameters
+        k (float): scaling constant
+        chunk (int, optional): number of records processed at once. Defaults to TUNE_CHUNK.
+
+    Returns:
+        float: the mean squared error
+    """
+    total = 0.0
+    for features, results in _chunks(data, chunk):
+        total += np.sum((results - sigmoid(features @ params, k)) ** 2)
+    return total / len(data)
+
+
+def find_k(data: np.ndarray, params: np.ndarray, chunk: int = TUNE_CHUNK, low: float = 0.0, high: float = 10.0) -> float:
+    """Finds the scaling constant that fits the current evaluation best with a golden section search.
+
+    Args:
+        data (np.ndarray): the memory mapped records
+        params (np.ndarray): the evaluation parameters
+        chunk (int, optional): number of records processed at once. Defaults to TUNE_CHUNK.
+        low (float, optional): lowest constant tried. Defaults to 0.0.
+        high (float, optional): highest constant tried. Defaults to 10.0.
+
+    Returns:
+        float: the scaling constant
+    """
+    ratio = (math.sqrt(5) - 1) / 2
+    a, b = high - ratio * (high - low), low + ratio * (high - low)
+    error_a, error_b = compute_error(data, params, a, chunk), compute_error(data, params, b, chunk)
+    while high - low > 1e-3:
+        if error_a < error_b:
+            high, b, error_b = b, a, error_a
+            a = high - ratio * (high - low)
+            error_a = compute_error(data, params, a, chunk)
+        else:
+            low, a, error_a = a, b, error_b
+            b = low + ratio * (high - low)
+            error_b = compute_error(data, params, b, chunk)
+    return (low + high) / 2
+
+
+def tune(data: np.ndarray, params: np.ndarray, k: float, iterations: int = 50, chunk: int = TUNE_CHUNK, verbose: bool = False) -> Tuple[np.ndarray, float]:
+    """Minimizes the error of the evaluation parameters with damped Gauss-Newton steps (Levenberg-Marquardt). The evaluation is linear in the parameters, so every step only needs one pass to sum the 9x9 system and one pass to check the new error, however many positions there are.
+
+    Args:
+        data (np.ndarray): the memory mapped records
+        params (np.ndarray): the starting parameters
+        k (float): scaling constant
+        iterations (int, optional): maximum number of steps. Defaults to 50.
+        chunk (int, optional): number of records processed at once. Defaults to TUNE_CHUNK.
+        verbose (bool, optional): wether to print the error after every step. Defaults to False.
+
+    Returns:
+        Tuple[np.ndarray, float]: the tuned parameters and their error
+    """
+    error = compute_error(data, params, k, chunk)
+    damping = 1e-3
+    for iteration in range(1, iterations + 1):
+        hessian = np.zeros((len(params), len(params)))
+        gradient = np.zeros(len(params))
+        for features, results in _chunks(data, chunk):
+            expected = sigmoid(features @ params, k)
+            jacobian = features * (expected * (1 - expected) * k * _LN10 / 4)[:, None]
+            hessian += jacobian.T @ jacobian
+            gradient += jacobian.T @ (expected - results)
+
+        # the damping is raised until a step lowers the error, a step that can not lower it means the error is minimal
+        while damping < 1e6:
+            system = hessian + damping * np.diag(np.diag(hessian))
+            new_params = params - np.linalg.lstsq(system, gradient, rcond=None)[0]
+            new_error = compute_error(data, new_params, k, chunk)
+            if new_error < error:
+                break
+            damping *= 10
+        else:
+            break
+
+        improvement = error - new_error
+        params, error = new_params, new_error
+        damping = max(damping / 10, 1e-7)
+        if verbose:
+            print(f'iteration {iteration}: error {error:.8f}')
+        if improvement < 1e-10:
+            break
+
+    return params, error
+
+
+def main(argv: List[str] = None) -> dict:
+    """Command line entry point of the tuner, run with python -m Game.tune.
+
+    Args:
+        argv (List[str], optional): command line arguments. Defaults to the arguments of the process.
+
+    Returns:
+        dict: the written parameters
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m Game.tune', description='Tunes the piece values and placement weights of the evaluation on positions labeled with the result of their game.')
+    parser.add_argument('files', nargs='*',
+                        help='files with a fen or epd and its result like [1.0] or c9 "1-0"; per line, or pgn files')
+    parser.add_argument('-o', '--output', default=EVAL_PARAMS_FILE,
+                        help='file the parameters are written to, loaded by the engine on start')
+    parser.add_argument('--cache', help='file the features are kept in, reused when no files are given')
+    parser.add_argument('--iterations', type=int, default=50, help='maximum number of steps')
+    parser.add_argument('-k', type=float, help='scaling constant, found from the data by default')
+    parser.add_argument('--skip-plies', type=int, default=TUNE_SKIP_PLIES,
+                        help='opening plies of every pgn game that are not used')
+    args = parser.parse_args(argv)
+
+    if not args.files and not (args.cache and os.path.exists(args.cache)):
+        parser.error('give files with labeled positions or an existing --cache')
+
+    if args.cache:
+        cache = args.cache
+    else:
+        fd, cache = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+    try:
+        if args.files:
+            with open(cache, 'wb') as output:
+                count = extract_features(read_labeled(args.files, args.skip_plies), output)
+            print(f'{count} positions read')
+        if not os.path.getsize(cache):
+            parser.error('no labeled positions found')
+        data = np.memmap(cache, dtype=_RECORD, mode='r')
+
+        params = get_params()
+        k = args.k if args.k is not None else find_k(data, params)
+        print(f'K: {round(k, 4)}, error: {compute_error(data, params, k):.8f}')
+        params, error = tune(data, params, k, args.iterations, verbose=True)
+        del data
+    finally:
+        if not args.cache:
+            os.remove(cache)
+
+    values = save_params(params, args.output)
+    for name, value in zip(PARAM_NAMES, params):
+        print(f'{name:<17} {round(float(value), 4)}')
+    print(f'error: {error:.8f}, written to {args.output}')
+    return values
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+import sys
+import threading
+from typing import List
+
+from .settings import *
+from .support import *
+from .board import Board
+from .engine import Engine
+from .move import Move
+from .clock import allocate_time
+
+DEFAULT_HASH = 16
+
+
+def format_score(score: float) -> str:
+    """Converts an evaluation to a uci score, mate scores are given in moves and other scores in centipawns.
+
+    Args:
+        score (float): evaluation from the perspective of the player to move
+
+    Returns:
+        str: uci score, e.g. "cp 35" or "mate -2"
+    """
+    mate = get_mate_distance(score)
+    if mate is not None:
+        return f'mate {mate}'
+    return f'cp {round(score * 100)}'
+
+
+class UCI:
+    def __init__(self, output=None) -> None:
+        """Initializes the uci front end with a board in the starting position and an engine.
+
+        Args:
+            output (optional): file the responses are written to. Defaults to sys.stdout.
+        """
+        self.output = output or sys.stdout
+        self.board = Board(START_FEN)
+        self.engine = Engine(self.board, hash_size=DEFAULT_HASH)
+        self.threads = 1
+
+        self._search_thread = None
+        self._infinite = False
+        self._stopped = threading.Event()
+        self._output_lock = threading.Lock()
+
+    def send(self, line: str) -> None:
+        """Writes a line to the gui.
+
+        Args:
+            line (str): the line to be written
+        """
+        with self._output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def loop(self, input=None) -> None:
+        """Reads commands until the quit command is given or the input ends.
+
+        Args:
+            input (optional): file the commands are read from. Defaults to sys.stdin.
+        """
+        for line in input or sys.stdin:
+            if not self.handle(line):
+                break
+        self.stop_search()
+
+    def handle(self, line: str) -> bool:
+        """Handles a single command, commands with invalid arguments are ignored.
+
+        Args:
+            line (str): the command line
+
+        Returns:
+            bool: False when the quit command was given
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        # a malformed command is reported and ignored, it must not end the engine
+        try:
+            if command == 'uci':
+                self.send('id name PyChess')
+                self.send('id author JesseCrans')
+                self.send(
+                    f'option name Hash type spin default {DEFAULT_HASH} min 1 max 4096')
+                self.send('option name Threads type spin default 1 min 1 max 1')
+                self.send('option name EvalFile type string default <empty>')
+                self.send('uciok')
+            elif command == 'isready':
+                self.send('readyok')
+            elif command == 'setoption':
+                self.set_option(args)
+            elif command == 'ucinewgame':
+                self.stop_search()
+                self.engine.tt.clear()
+            elif command == 'position':
+                self.stop_search()
+                self.set_position(args)
+            elif command == 'go':
+                self.stop_search()
+                self.go(args)
+            elif command == 'stop':
+                self.stop_search()
+            elif command == 'quit':
+                return False
+        except (ValueError, IndexError) as error:
+            self.send(f'info string invalid command "{line.strip()}": {error}')
+
+        return True
+
+    def set_option(self, args: List[str]) -> None:
+        """Handles the setoption command, "setoption name <name> value <value>".
+
+        Args:
+            args (List[str]): the arguments of the command
+        """
+        if 'name' not in args or 'value' not in args:
+            return
+        name = ' '.join(args[args.index('name') + 1:args.index('value')])
+        value = ' '.join(args[args.index('value') + 1:])
+
+        if name.lower() == 'hash':
+            self.stop_search()
+            self.engine.set_hash_size(int(value))
+        elif name.lower() == 'threads':
+            # the search runs on a single thread, the option is accepted for compatibility
+            self.threads = int(value)
+        elif name.lower() == 'evalfile':
+            self.stop_search()
+            if value and value != '<empty>':
+                # numpy is only needed when a network is used, a network that can not be loaded keeps the current evaluation
+                try:
+                    from .nnue import NNUEEvaluator
+                    evaluator = NNUEEvaluator(value)
+                except (ImportError, OSError, ValueError) as error:
+                    self.send(f'info string EvalFile {value} not loaded: {error}')
+                    return
+                self.engine.set_evaluator(evaluator)
+            else:
+                self.engine.set_evaluator(None)
+
+    def set_position(self, args: List[str]) -> None:
+        """Handles the position command, "position [fen <fen> | startpos] moves <move1> ... <movei>".
+
+        Args:
+            args (List[str]): the arguments of the command
+        """
+        if 'moves' in args:
+            moves = args[args.index('moves') + 1:]
+            args = args[:args.index('moves')]
+        else:
+            moves = []
+
+        if args and args[0] == 'fen':
+            fen = ' '.join(args[1:])
+            if len(fen.split(' ')) == 4:
+                fen += ' 0 1'
+        else:
+            fen = START_FEN
+
+        # an invalid fen is read before the board is changed, so the board keeps its position
+        Board(fen)
+        self.board.fen = fen
+        self.board.reset()
+        for notation in moves:
+            move = self.find_move(notation)
+            if move is None:
+                break
+            self.board.make_move(move)
+
+    def find_move(self, notation: str) -> Move:
+        """Finds the legal move in the current position given in long algebraic notation.
+
+        Args:
+            notation (str): the move, e.g. e2e4 or e7e8q
+
+        Returns:
+            Move: the legal move, None if the move is not legal
+        """
+        for move in self.board.get_legal_moves():
+            if move.get_notation() == notation:
+                return move
+        return None
+
+    def go(self, args: List[str]) -> None:
+        """Handles the go command by starting the search on a separate thread.
+
+        Args:
+            args (List[str]): the arguments of the command
+        """
+        options = {}
+        for i, arg in enumerate(args):
+            if arg in ('depth', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo') and i + 1 < len(args):
+                options[arg] = int(args[i + 1])
+
+        depth = options.get('depth', MAX_DEPTH)
+        time_limit = soft_limit = None
+        if 'movetime' in options:
+            time_limit = options['movetime'] / 1000
+        elif 'wtime' in options or 'btime' in options:
+            color = 'w' if self.board.turn == 0 else 'b'
+            soft_limit, time_limit = allocate_time(options.get(f'{color}time', 0) / 1000, options.get(
+                f'{color}inc', 0) / 1000, self.board.fullturn, options.get('movestogo'))
+        self._infinite = 'infinite' in args
+
+        # a stop that arrives before the thread has started searching must not be lost
+        self.engine.clear_stop()
+        self._stopped.clear()
+        self._search_thread = threading.Thread(
+            target=self._search, args=(depth, time_limit, soft_limit), daemon=True)
+        self._search_thread.start()
+
+    def _search(self, depth: int, time_limit: float, soft_limit: float = None) -> None:
+        """Runs the search and sends the best move, started by the go command.
+
+        Args:
+            depth (int): maximum search depth
+            time_limit (float): maximum search time in seconds, None for no limit
+            soft_limit (float, optional): time in seconds after which no new depth is started. Defaults to None.
+        """
+        best_move = self.engine.search(
+            depth, time_limit, self.send_info, soft_limit=soft_limit)
+
+        # in infinite mode the best move may only be sent after the stop command
+        if self._infinite:
+            self._stopped.wait()
+
+        if best_move:
+            self.send(f'bestmove {best_move.get_notation()}')
+        else:
+            self.send('bestmove 0000')
+
+    def send_info(self, info: dict) -> None:
+        """Sends the search progress of a completed depth.
+
+        Args:
+            info (dict): the progress given by Engine.search
+        """
+        pv = ' '.join(move.get_notation() for move in info['pv'])
+        self.send(
+            f'info depth {info["depth"]} score {format_score(info["score"])} nodes {info["nodes"]} nps {info["nps"]} time {round(info["time"] * 1000)} pv {pv}')
+
+    def stop_search(self) -> None:
+        """Stops a running search and waits until its best move has been sent.
+        """
+        if self._search_thread:
+            self.engine.stop()
+            self._stopped.set()
+            self._search_thread.join()
+            self._search_thread = None
+
+
+def main() -> None:
+    """Command line entry point of the uci front end, run with python -m Game.uci.
+    """
+    UCI().loop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,43 +1,129 @@
+import os
+import queue
 import pygame
+import pyperclip
 import threading
 
 from Game.support import *
 from Game.interface import Interface
 from Game.board import Board
 from Game.engine import Engine
+from Game.book import Book
+from Game.tablebase import Tablebases
+from Game.clock import Clock, allocate_time
 
 DEPTH = 4  # default depth
 
+WIN = pygame.display.set_mode((SCREEN_SIZE + UI_WIDTH, SCREEN_SIZE))
+pygame.display.set_caption('PyChess')
+
 # r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1
 # rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1
 
 
+def start_engine(engine: Engine, info_queue: queue.Queue, clock: Clock = None) -> threading.Thread:
+    """Searches the best move on a separate thread, the move is posted as an ENGINE_MOVE event so the main loop can keep waiting for events. The progress of the search is put on the info queue. With a clock the time of the search is allocated from the remaining time of the engine, otherwise it searches to the depth of the engine.
+
+    Args:
+        engine (Engine): the engine to search with
+        info_queue (queue.Queue): queue the search info is put on
+        clock (Clock, optional): the clock of the game. Defaults to None.
+
+    Returns:
+        threading.Thread: the thread of the search
+    """
+    board = engine.board
+    # the search reports scores for the player to move, the panel shows them from white's perspective
+    sign = 1 if board.turn == 0 else -1
+
+    def report(info: dict) -> None:
+        # called between depths, when the board is in the searched position
+        info_queue.put({
+            'depth': info['depth'],
+            'score': sign * info['score'],
+            'nodes': info['nodes'],
+            'nps': info['nps'],
+            'pv': board.get_san_line(info['pv'])
+        })
+
+    time_limit = soft_limit = None
+    if clock:
+        soft_limit, time_limit = allocate_time(
+            clock.get_time(board.turn), clock.increment, board.fullturn)
+
+    def search() -> None:
+        best_move = engine.find_best_move(report, time_limit, soft_limit)
+        pygame.event.post(pygame.event.Event(ENGINE_MOVE, move=best_move))
+
+    engine.progress = info_queue.put
+    engine.clear_stop()
+
+    thread = threading.Thread(target=search, daemon=True)
+    thread.start()
+    return thread
+
+
+def stop_engine(engine: Engine, thread: threading.Thread, info_queue: queue.Queue) -> None:
+    """Stops a running search and drops the move and info it posts.
+
+    Args:
+        engine (Engine): the searching engine
+        thread (threading.Thread): the thread of the search
+        info_queue (queue.Queue): queue the search info is put on
+    """
+    engine.stop()
+    thread.join()
+    pygame.event.clear(ENGINE_MOVE)
+    while not info_queue.empty():
+        info_queue.get()
+
+
 def main() -> None:
-    """Responsible for the main game loop and handles player key and mouse button clicks.
+    """Responsible for the main game loop and handles player key and mouse button clicks. The loop sleeps until an event arrives, the engine searches on a separate thread.
     """
     run = True
-    clock = pygame.time.Clock()
     board = Board('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1')
     interface = Interface(WIN, board)
     engine = Engine(board, DEPTH)
+    if os.path.exists(BOOK_FILE):
+        engine.book = Book(BOOK_FILE)
+    if os.path.isdir(TB_DIR):
+        engine.tablebases = Tablebases(TB_DIR)
     engine_move_made = True
+    engine_thread = None
+    info_queue = queue.Queue()
 
     while run:
-        clock.tick(FPS)
-        ended = interface.draw()
-        pygame.display.update()
-
-        if not engine_move_made and not ended:
-            best_move = engine.find_best_move()
-            if best_move:
-                interface.make_move(best_move)
-            engine_move_made = True
-
-        for event in pygame.event.get():
+        while not info_queue.empty():
+            interface.update_info(info_queue.get())
+
+        # the board is used by the search, so it is only drawn while the engine is not thinking
+        if engine_thread is None:
+            ended = interface.draw()
+
+            if not engine_move_made and not ended:
+                interface.clear_info()
+                engine_thread = start_engine(engine, info_queue, interface.clock)
+        else:
+            interface.draw_info()
+
+        # while the engine is thinking or a clock runs the loop wakes up to draw the search info and clocks
+        clock_running = interface.clock and interface.clock.running is not None
+        timeout = round(INFO_INTERVAL * 1000) if engine_thread or clock_running else EVENT_TIMEOUT
+        events = [pygame.event.wait(timeout)] + pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 run = False
+            elif event.type == ENGINE_MOVE:
+                # a move of a search that was stopped in the same batch of events is dropped
+                if engine_thread is None:
+                    continue
+                engine_thread = None
+                engine_move_made = True
+                if event.move:
+                    interface.make_move(event.move)
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                if not ended:
+                if not ended and engine_thread is None:
                     pos = pygame.mouse.get_pos()
                     rank, file = get_row_col_from_mouse(pos)
                     if 0 <= rank < 8 and 0 <= file < 8:
@@ -47,42 +133,45 @@ def main() -> None:
             elif event.type == pygame.KEYDOWN:
                 keys = pygame.key.get_pressed()
 
+                # resetting and taking back stop the search, the other keys are ignored while it runs
+                if engine_thread is not None:
+                    if event.key not in (pygame.K_r, pygame.K_z):
+                        continue
+                    stop_engine(engine, engine_thread, info_queue)
+                    engine_thread = None
+                    engine_move_made = True
+
                 if event.key == pygame.K_r:
                     interface.reset()
 
                 elif event.key == pygame.K_f:
-                    print(interface.board.get_fen())
+                    fen = interface.board.get_fen()
+                    pyperclip.copy(fen)
+                    print(fen)
 
                 elif event.key == pygame.K_z:
-                    interface.board.unmake_move()
+                    interface.unmake_move()
 
                 # perft tests
-                elif keys[pygame.K_p] and keys[pygame.K_r] and keys[pygame.K_1]:
-                    engine.perft_range(1)
-                elif keys[pygame.K_p] and keys[pygame.K_r] and keys[pygame.K_2]:
-                    engine.perft_range(2)
-                elif keys[pygame.K_p] and keys[pygame.K_r] and keys[pygame.K_3]:
-                    engine.perft_range(3)
-                elif keys[pygame.K_p] and keys[pygame.K_r] and keys[pygame.K_4]:
-                    engine.perft_range(4)
-                elif keys[pygame.K_p] and keys[pygame.K_r] and keys[pygame.K_5]:
-                    engine.perft_range(5)
-                elif keys[pygame.K_p] and keys[pygame.K_r] and keys[pygame.K_6]:
-                    engine.perft_range(6)
-
-                elif keys[pygame.K_p] and keys[pygame.K_d] and keys[pygame.K_1]:
-                    engine.perft_divide(1)
-                elif keys[pygame.K_p] and keys[pygame.K_d] and keys[pygame.K_2]:
-                    engine.perft_divide(2)
-                elif keys[pygame.K_p] and keys[pygame.K_d] and keys[pygame.K_2]:
-                    engine.perft_divide(3)
-                elif keys[pygame.K_p] and keys[pygame.K_d] and keys[pygame.K_3]:
-                    engine.perft_divide(4)
-                elif keys[pygame.K_p] and keys[pygame.K_d] and keys[pygame.K_4]:
-                    engine.perft_divide(5)
-                elif keys[pygame.K_p] and keys[pygame.K_d] and keys[pygame.K_5]:
-                    engine.perft_divide(6)
-
+                elif keys[pygame.K_p] and keys[pygame.K_r]:
+                    for depth in range(1, 7):
+                        if keys[pygame.K_0 + depth]:
+                            for result in engine.perft_range(depth):
+                                print(
+                                    f'depth: {result["depth"]} \n\t nodes: {result["nodes"]}, time: {result["time"]}s')
+                            break
+
+                elif keys[pygame.K_p] and keys[pygame.K_d]:
+                    for depth in range(1, 7):
+                        if keys[pygame.K_0 + depth]:
+                            divide = engine.perft_divide(depth)
+                            for key in divide:
+                                print(f'{key}: {divide[key]}')
+                            print(f'Nodes searched: {sum(divide.values())}')
+                            break
+
+    if engine_thread is not None:
+        stop_engine(engine, engine_thread, info_queue)
     pygame.quit()
 
 